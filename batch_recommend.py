@@ -0,0 +1,111 @@
+# Subject recommendations for every student at once (e.g. for advising week).
+#
+# The records are taken from the data store once, then students are handled
+# programme by programme. Each programme has a bitset of the subjects it
+# offers and each student a bitset of the subjects passed (prereq_graph.py),
+# so a student's recommendations are
+#     eligible(passed) & offered & ~passed
+# where eligible() is worked out once per distinct passed set; students who
+# have passed the same subjects (new students, a cohort on the same plan)
+# share it. Results are written to CSV and XML and the time spent in each
+# stage is reported.
+
+import csv
+import os
+import time
+import xml.etree.ElementTree as ET
+
+from data_store import *
+from prereq_graph import *
+
+RECOMMENDATION_CSV = "report/recommendations.csv"
+RECOMMENDATION_XML = "report/recommendations.xml"
+
+
+def recommend_all():
+    """Return ({student ID: [recommended subject codes]}, [(stage, seconds)])."""
+    timings = []
+    start = time.perf_counter()
+
+    def stage(name):
+        nonlocal start
+        now = time.perf_counter()
+        timings.append((name, now - start))
+        start = now
+
+    store = get_store()
+    students = store.list_students()
+    subjects = store.list_subjects()
+    store.list_grades()
+    stage("Load records")
+
+    graph = get_prerequisite_graph()
+    graph.ensure_passed()
+    stage("Prerequisite graph and passed sets")
+
+    by_programme = {}
+    for student in students:
+        by_programme.setdefault(student.programme, []).append(student.id)
+    stage("Group by programme")
+
+    recommendations = {}
+    eligible_for = {}  # passed bitset -> eligible bitset
+    for programme, student_ids in by_programme.items():
+        offered = graph.mask_of(s.code for s in subjects if offered_to(s, programme))
+        for student_id in student_ids:
+            passed = graph.passed(student_id)
+            eligible = eligible_for.get(passed)
+            if eligible is None:
+                eligible = eligible_for[passed] = graph.eligible_mask(passed)
+            recommendations[student_id] = sorted(graph.codes_of(eligible & offered & ~passed))
+    stage(f"Recommend ({len(eligible_for)} distinct passed sets)")
+    return recommendations, timings
+
+
+def write_recommendations_csv(path, students, recommendations):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["student_id", "name", "programme", "count", "recommended"])
+        for s in students:
+            codes = recommendations.get(s.id, [])
+            writer.writerow([s.id, s.name, s.programme, len(codes), " ".join(codes)])
+
+
+def write_recommendations_xml(path, students, recommendations):
+    root = ET.Element("recommendations")
+    for s in students:
+        elem = ET.SubElement(root, "student", id=s.id, programme=s.programme)
+        for code in recommendations.get(s.id, []):
+            ET.SubElement(elem, "subject", code=code)
+    write_xml(path, root)
+
+
+def export_recommendations(csv_path=RECOMMENDATION_CSV, xml_path=RECOMMENDATION_XML):
+    """Recommend subjects for every student, write the CSV and XML files and
+    print the per-stage timings."""
+    recommendations, timings = recommend_all()
+    students = get_store().list_students()
+
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(csv_path) or ".", exist_ok=True)
+    write_recommendations_csv(csv_path, students, recommendations)
+    timings.append(("Write CSV", time.perf_counter() - start))
+    start = time.perf_counter()
+    os.makedirs(os.path.dirname(xml_path) or ".", exist_ok=True)
+    write_recommendations_xml(xml_path, students, recommendations)
+    timings.append(("Write XML", time.perf_counter() - start))
+
+    total = sum(len(codes) for codes in recommendations.values())
+    print(f"\nRecommended {total} subject(s) for {len(recommendations)} student(s).")
+    print(f"Written to {csv_path} and {xml_path}\n")
+    print(f"{'Stage':<45}{'Time (ms)':>10}")
+    print("-" * 55)
+    for name, seconds in timings:
+        print(f"{name:<45}{seconds * 1000:>10.1f}")
+    print("-" * 55)
+    print(f"{'Total':<45}{sum(s for _, s in timings) * 1000:>10.1f}")
+
+# If this file is executed, redirect to main.py
+if __name__ == "__main__":
+    import main
+    main.main()
@@ -0,0 +1,169 @@
+# Grading dashboard aggregates.
+#
+# Top students by CGPA, the student count / average CGPA and the failure
+# count per subject are computed in one pass over the data store and then
+# kept up to date from store change events, so showing the dashboard does not
+# depend on the size of the cohort.
+
+import heapq
+
+from data_store import *
+
+
+class RankedHeap:
+    """Max-heap of key -> score that supports changing and removing keys.
+
+    Changed or removed entries are left in the heap and skipped when they
+    reach the top (lazy deletion); the heap is rebuilt once stale entries
+    outnumber live ones.
+    """
+
+    def __init__(self):
+        self._scores = {}
+        self._heap = []
+
+    def __len__(self):
+        return len(self._scores)
+
+    def get(self, key, default=None):
+        return self._scores.get(key, default)
+
+    def set(self, key, score):
+        if self._scores.get(key) == score:
+            return
+        self._scores[key] = score
+        heapq.heappush(self._heap, (-score, key))
+        if len(self._heap) > 2 * len(self._scores) + 16:
+            self._heap = [(-s, k) for k, s in self._scores.items()]
+            heapq.heapify(self._heap)
+
+    def remove(self, key):
+        self._scores.pop(key, None)
+
+    def top(self, n):
+        """Return up to n (key, score) pairs, highest score first."""
+        result = []
+        seen = set()
+        while self._heap and len(result) < n:
+            neg_score, key = heapq.heappop(self._heap)
+            if key in seen or self._scores.get(key) != -neg_score:
+                continue  # stale entry
+            seen.add(key)
+            result.append((key, -neg_score))
+        for key, score in result:
+            heapq.heappush(self._heap, (-score, key))
+        return result
+
+
+class DashboardStats:
+    def __init__(self, store):
+        self.store = store
+        self._build_students()
+        self._build_failures()
+
+    def _build_students(self):
+        self.cgpa = RankedHeap()
+        self.cgpa_sum = 0.0
+        for student in self.store.list_students():
+            self._set_student(student.id, student)
+
+    def _build_failures(self):
+        self.failures = RankedHeap()
+        self._failed = set()  # (student ID, subject code) of failed grades
+        for grade in self.store.list_grades():
+            self._set_grade((grade.student_id, grade.subject_code), grade)
+
+    def _set_student(self, student_id, student):
+        old = self.cgpa.get(student_id)
+        if old is not None:
+            self.cgpa_sum -= old
+        if student is None:
+            self.cgpa.remove(student_id)
+        else:
+            new = student.cgpa
+            self.cgpa_sum += new
+            self.cgpa.set(student_id, new)
+
+    def _set_grade(self, key, grade):
+        was_failed = key in self._failed
+        is_failed = grade is not None and grade.gpa <= 0.0
+        if was_failed == is_failed:
+            return
+        code = key[1]
+        count = self.failures.get(code, 0) + (1 if is_failed else -1)
+        if is_failed:
+            self._failed.add(key)
+        else:
+            self._failed.discard(key)
+        if count > 0:
+            self.failures.set(code, count)
+        else:
+            self.failures.remove(code)
+
+    def on_change(self, kind, key, record):
+        if kind == "student":
+            if key is None:
+                self._build_students()
+            else:
+                self._set_student(key, record)
+        elif kind == "grade":
+            if key is None:
+                self._build_failures()
+            else:
+                self._set_grade(key, record)
+
+    def top_students(self, n=3):
+        """Return [(Student, cgpa)] for the n students with the highest CGPA."""
+        return [(self.store.get_student(sid), cgpa) for sid, cgpa in self.cgpa.top(n)]
+
+    def summary(self):
+        """Return (number of students, average CGPA)."""
+        total = len(self.cgpa)
+        return total, (self.cgpa_sum / total if total else 0.0)
+
+    def most_failed_subject(self):
+        """Return (subject code, failure count), or None if nobody failed."""
+        top = self.failures.top(1)
+        return top[0] if top else None
+
+
+_dashboard = None
+
+def get_dashboard():
+    """Return the process-wide DashboardStats, building it on first use."""
+    global _dashboard
+    if _dashboard is None:
+        store = get_store()
+        _dashboard = DashboardStats(store)
+        store.add_listener(_dashboard.on_change)
+    return _dashboard
+
+def show_top_3_students():
+    print("\nTop 3 Students by CGPA")
+    print("-" * 60)
+    print(f"{'ID':<10}{'Name':<25}{'CGPA':<10}")
+    print("-" * 60)
+    for student, cgpa in get_dashboard().top_students(3):
+        print(f"{student.id:<10}{student.name:<25}{cgpa:<10.2f}")
+
+def show_student_summary():
+    total, average = get_dashboard().summary()
+    print("\nStudent Summary")
+    print("-" * 60)
+    print(f"Total Students      : {total}")
+    print(f"Average CGPA        : {average:.2f}")
+
+def show_failure_insight():
+    worst = get_dashboard().most_failed_subject()
+    if worst is None:
+        return
+    subject_code, failures = worst
+    print("\nSubject with Highest Failure Rate")
+    print("-" * 60)
+    print(f"Subject Code        : {subject_code}")
+    print(f"Failure Count       : {failures}\n")
+
+# If this file is executed, redirect to main.py
+if __name__ == "__main__":
+    import main
+    main.main()
@@ -0,0 +1,1160 @@
+# In-memory data store shared by student_module.py, subject_module.py,
+# grading_module.py, grading_share_utils.py and rdf_utils.py.
+#
+# The three XML files are parsed once into records kept in dicts:
+#   students : student ID                  -> Student
+#   subjects : subject code                -> Subject
+#   grades   : (student ID, subject code)  -> Grade
+# plus a secondary index of each student's grades (student ID -> {subject
+# code -> Grade}) so per-student lookups never scan the whole grade file.
+# A file is parsed again only when its modification time changes on disk
+# (e.g. it was edited by hand or by another running copy of the system).
+#
+# CGPA is maintained incrementally: each student has running totals of grade
+# points, CGPA credit hours and taken credit hours. Adding, editing or
+# deleting a grade applies that grade's contribution as a delta, and a change
+# to a subject's credit hours or grading type only re-adjusts the students
+# holding that subject. The new CGPA fields of the students whose grades
+# changed are written to the grade journal with the grades, and students.xml
+# is only rewritten with them when the journal is compacted.
+#
+# Other modules can keep derived data (RDF graphs, dashboards, search
+# indexes) in sync by registering a listener with add_listener(). Listeners
+# are called as listener(kind, key, record) after every change, where kind is
+# "student", "subject" or "grade", key is the student ID, subject code or
+# (student ID, subject code), and record is the new record or None if it was
+# deleted. key is None when the whole dataset was reloaded from disk.
+# Listeners registered with add_commit_listener() are called once per commit
+# instead, with the commit's list of (kind, key, record) events, for derived
+# files that are cheaper to rewrite once than per change.
+#
+# With STORE_BACKEND set to "sqlite" the store is a SqliteStore
+# (sqlite_store.py), which keeps all of the above but saves to a database.
+
+import xml.etree.ElementTree as ET
+import atexit
+import functools
+import hashlib
+import json
+import os
+import pickle
+from array import array
+from collections import namedtuple
+from contextlib import contextmanager
+from dataclasses import dataclass, fields
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; writes are then not locked
+    fcntl = None
+
+STUDENT_FILE = "data/students.xml"
+SUBJECT_FILE = "data/subjects.xml"
+GRADE_FILE = "data/grades.xml"
+GRADE_MAP_FILE = "data/grades.map"  # see grade_map.py
+
+# "xml" keeps the records in the XML files above; "sqlite" keeps them in
+# SQLITE_FILE (see sqlite_store.py). Set with the STORE_BACKEND environment
+# variable.
+STORE_BACKEND = os.environ.get("STORE_BACKEND", "xml")
+SQLITE_FILE = "data/store.db"
+
+# Binary snapshot written next to each XML file (<file>.snapshot)
+SNAPSHOT_SUFFIX = ".snapshot"
+SNAPSHOT_VERSION = 1
+
+# Grade changes are appended to <grade file>.journal and folded back into
+# the XML once the journal holds JOURNAL_COMPACT_AT entries (and at exit).
+JOURNAL_SUFFIX = ".journal"
+JOURNAL_SYNC_EVERY = 32
+JOURNAL_COMPACT_AT = 1000
+
+# Commits from several processes are serialised by an advisory lock on
+# <grade file>.lock; reads never take it.
+LOCK_SUFFIX = ".lock"
+
+
+# Records use __slots__ and keep numbers parsed (credit hours as int, marks
+# as int, GPA/CGPA as float); they are formatted back to text only when
+# written to XML or displayed.
+
+@dataclass(slots=True)
+class Student:
+    id: str
+    name: str
+    programme: str
+    email: str
+    taken_ch: int = 0
+    cgpa: float = 0.0
+    cgpa_ch: int = 0  # used to calculate cgpa as pass/fail subject wont count in CGPA calculation
+
+
+@dataclass(slots=True)
+class Subject:
+    code: str
+    name: str
+    credit: int
+    programme: str = ""
+    prerequisite: str = ""
+    grading: str = "G"
+
+
+@dataclass(slots=True)
+class Grade:
+    student_id: str
+    subject_code: str
+    mark: int
+    grade_value: str
+    gpa: float
+
+
+@dataclass(slots=True)
+class CgpaTotals:
+    points: float = 0.0  # sum of gpa * credit hour (grading type 'G' only)
+    cgpa_ch: int = 0     # credit hours counted in CGPA (grading type 'G' only)
+    taken_ch: int = 0    # all taken credit hours (G and P)
+
+    @property
+    def cgpa(self):
+        return self.points / self.cgpa_ch if self.cgpa_ch > 0 else 0.0
+
+
+class DuplicateKeyError(ValueError):
+    """Raised when adding a record whose key is already taken."""
+
+    reason = "already exists"
+
+    def __init__(self, kind, key):
+        self.kind = kind
+        self.key = key
+        name = " / ".join(key) if isinstance(key, tuple) else key
+        ValueError.__init__(self, f"{kind} {name} {self.reason}")
+
+
+class ConflictError(DuplicateKeyError):
+    """Raised when a transaction is committed after another process added a
+    record with the same key as one the transaction adds. Nothing of the
+    transaction is saved."""
+
+    reason = "was added by another user in the meantime"
+
+
+def _text(elem, tag, default=""):
+    child = elem.find(tag)
+    if child is None or child.text is None:
+        return default
+    return child.text.strip()
+
+
+def _number(elem, tag, cast, default=0):
+    # child element text as int or float, default if missing or not a number
+    text = _text(elem, tag)
+    try:
+        return cast(text)
+    except ValueError:
+        pass
+    try:
+        return cast(float(text))
+    except ValueError:
+        return default
+
+
+def _file_version(path):
+    # (mtime, size) of the file, None if it does not exist yet
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _student_from_elem(s):
+    return Student(
+        id=s.get("id"),
+        name=_text(s, "name"),
+        programme=_text(s, "programme"),
+        email=_text(s, "email"),
+        taken_ch=_number(s, "taken_CH", int),
+        cgpa=_number(s, "cgpa", float, 0.0),
+        cgpa_ch=_number(s, "cgpa_CH", int),
+    )
+
+def _subject_from_elem(s):
+    return Subject(
+        code=s.get("code"),
+        name=_text(s, "name"),
+        credit=_number(s, "credit", int),
+        programme=_text(s, "programme"),
+        prerequisite=_text(s, "prerequisite"),
+        grading=_text(s, "grading", "G"),
+    )
+
+
+# Streaming readers. These parse the file with iterparse and clear every
+# record element once it has been handled, so memory use does not grow with
+# the size of the file. They read the file on disk directly and are meant
+# for one-pass jobs such as large reports.
+
+def iter_elements(path, tag):
+    """Yield each <tag> child of the root element of an XML file."""
+    if not os.path.exists(path):
+        return
+    root = None
+    for event, elem in ET.iterparse(path, events=("start", "end")):
+        if root is None:
+            root = elem
+        elif event == "end" and elem.tag == tag:
+            yield elem
+            root.clear()  # drop the records handled so far
+
+def iter_students(path=STUDENT_FILE):
+    for elem in iter_elements(path, "student"):
+        yield _student_from_elem(elem)
+
+def iter_subjects(path=SUBJECT_FILE):
+    for elem in iter_elements(path, "subject"):
+        yield _subject_from_elem(elem)
+
+# Same field names as Grade, so a GradeRow can be used wherever a Grade is read
+GradeRow = namedtuple("GradeRow", "student_id subject_code mark grade_value gpa")
+
+def iter_grades(student_id=None, subject_code=None, path=GRADE_FILE):
+    """Yield a GradeRow for each grade in the grade file.
+
+    If student_id and/or subject_code are given, only matching grades are
+    yielded; the filter is checked on the element attributes before the
+    rest of the element is read.
+    """
+    for g in iter_elements(path, "grade"):
+        sid = g.get("student_id")
+        code = g.get("subject_code")
+        if student_id is not None and sid != student_id:
+            continue
+        if subject_code is not None and code != subject_code:
+            continue
+        yield GradeRow(sid, code, _number(g, "mark", int), _text(g, "grade_value"), _number(g, "gpa", float, 0.0))
+
+
+# Binary snapshots. Every time the store writes an XML file it also writes
+# <file>.snapshot: a header (format version, record type and fields, SHA-256
+# of the XML file) followed by the records stored column by column, with
+# text columns interned (a table of distinct values plus array codes) and
+# numeric columns as arrays. On load the snapshot is used instead of parsing
+# the XML when the checksum still matches; otherwise the XML is parsed and
+# the snapshot rewritten. The XML remains the interchange format, so a hand
+# edit to it simply invalidates the snapshot.
+
+def _checksum(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _snapshot_header(cls, checksum):
+    return (SNAPSHOT_VERSION, cls.__name__, tuple(f.name for f in fields(cls)), checksum)
+
+def _pack_columns(cls, records):
+    columns = []
+    for f in fields(cls):
+        values = [getattr(r, f.name) for r in records]
+        if f.type is int:
+            columns.append(array('q', values))
+        elif f.type is float:
+            columns.append(array('d', values))
+        else:
+            table = {}
+            codes = array('i', [table.setdefault(v, len(table)) for v in values])
+            columns.append((list(table), codes))
+    return columns
+
+def _unpack_columns(cls, columns):
+    values = []
+    for f, column in zip(fields(cls), columns):
+        if f.type is int or f.type is float:
+            values.append(column)
+        else:
+            table, codes = column
+            values.append(map(table.__getitem__, codes))
+    return list(map(cls, *values))
+
+def write_snapshot(path, cls, records):
+    """Write the snapshot of the XML file at path holding records of type cls."""
+    tmp = path + SNAPSHOT_SUFFIX + ".tmp"
+    try:
+        with open(tmp, "wb") as f:
+            pickle.dump(_snapshot_header(cls, _checksum(path)), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(_pack_columns(cls, records), f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path + SNAPSHOT_SUFFIX)
+    except OSError:
+        pass  # the snapshot is only a cache; the XML has been written
+
+def read_snapshot(path, cls):
+    """Return the records in the snapshot of path, or None if there is no
+    snapshot or it does not match the XML file any more."""
+    try:
+        with open(path + SNAPSHOT_SUFFIX, "rb") as f:
+            if pickle.load(f) != _snapshot_header(cls, _checksum(path)):
+                return None
+            return _unpack_columns(cls, pickle.load(f))
+    except (OSError, EOFError, pickle.UnpicklingError, ValueError, TypeError):
+        return None
+
+def _load_records(path, cls, parse):
+    # records of an XML file, from its snapshot when it is up to date
+    records = read_snapshot(path, cls)
+    if records is None:
+        records = list(parse(path))
+        write_snapshot(path, cls, records)
+    return records
+
+def _parse_grades(path):
+    return (Grade(*row) for row in iter_grades(path=path))
+
+
+# XML writers
+
+def write_xml(path, root):
+    """Write an element tree to path through a temporary file and a rename,
+    so a crash part way through never leaves a truncated file behind."""
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        ET.ElementTree(root).write(f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+def students_xml(students):
+    root = ET.Element("students")
+    for s in students:
+        stu = ET.SubElement(root, "student", id=s.id)
+        ET.SubElement(stu, "name").text = s.name
+        ET.SubElement(stu, "programme").text = s.programme
+        ET.SubElement(stu, "email").text = s.email
+        ET.SubElement(stu, "taken_CH").text = str(s.taken_ch)
+        ET.SubElement(stu, "cgpa").text = f"{s.cgpa:.2f}"
+        ET.SubElement(stu, "cgpa_CH").text = str(s.cgpa_ch)
+    return root
+
+def subjects_xml(subjects):
+    root = ET.Element("subjects")
+    for s in subjects:
+        subj = ET.SubElement(root, "subject", code=s.code)
+        ET.SubElement(subj, "name").text = s.name
+        ET.SubElement(subj, "credit").text = str(s.credit)
+        ET.SubElement(subj, "programme").text = s.programme
+        ET.SubElement(subj, "prerequisite").text = s.prerequisite
+        ET.SubElement(subj, "grading").text = s.grading
+    return root
+
+def grades_xml(grades):
+    root = ET.Element("grades")
+    for g in grades:
+        record = ET.SubElement(root, "grade", student_id=g.student_id, subject_code=g.subject_code)
+        ET.SubElement(record, "mark").text = str(g.mark)
+        ET.SubElement(record, "grade_value").text = g.grade_value
+        ET.SubElement(record, "gpa").text = str(g.gpa)
+    return root
+
+
+class GradeJournal:
+    """Append-only log of grade changes.
+
+    Each entry is a JSON list, ["put", student ID, subject code, mark,
+    grade, gpa], ["del", student ID, subject code] or ["cgpa", student ID,
+    cgpa, taken credit hours, CGPA credit hours]. A line holds one entry,
+    or a list of entries written together by a transaction. Lines are
+    flushed to the OS as they are written and fsynced in batches of
+    JOURNAL_SYNC_EVERY. A line cut short by a crash is ignored when the
+    journal is read back, so a multi-entry line is applied all or nothing,
+    and is cut off by the next append.
+
+    The file is opened for each append (with the store's write lock held)
+    rather than kept open, since another process may compact the journal
+    and remove the file in between.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = 0   # entries in the file
+        self.appended = 0  # entries written by this process since the last reset
+        self._unsynced = 0
+
+    def append(self, *entries):
+        """Append one or more entries as a single line."""
+        line = json.dumps(entries[0] if len(entries) == 1 else list(entries)) + "\n"
+        with open(self.path, "ab+") as f:
+            self._cut_torn_line(f)
+            f.write(line.encode("utf-8"))
+            f.flush()
+            self._unsynced += len(entries)
+            if self._unsynced >= JOURNAL_SYNC_EVERY:
+                os.fsync(f.fileno())
+                self._unsynced = 0
+        self.entries += len(entries)
+        self.appended += len(entries)
+
+    @staticmethod
+    def _cut_torn_line(f):
+        # drop a last line left unfinished by a crashed writer, so the new
+        # line does not get glued onto it
+        size = f.seek(0, os.SEEK_END)
+        if size == 0:
+            return
+        f.seek(size - 1)
+        if f.read(1) == b"\n":
+            return
+        f.seek(0)
+        f.truncate(f.read().rfind(b"\n") + 1)
+
+    def sync(self):
+        if self._unsynced and os.path.exists(self.path):
+            with open(self.path, "rb+") as f:
+                os.fsync(f.fileno())
+        self._unsynced = 0
+
+    def read(self):
+        """Return the list of entries in the journal file."""
+        entries = []
+        try:
+            with open(self.path, "rb") as f:
+                for line in f:
+                    if not line.endswith(b"\n"):
+                        break
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if entry and isinstance(entry[0], list):
+                        entries.extend(entry)  # a transaction's batch
+                    else:
+                        entries.append(entry)
+        except FileNotFoundError:
+            pass
+        self.entries = len(entries)
+        return entries
+
+    def reset(self):
+        """Empty the journal once its entries are in the XML file."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.entries = 0
+        self.appended = 0
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+
+@contextmanager
+def _write_lock(path):
+    # exclusive advisory lock on path for the length of the block; flock
+    # locks are dropped by the OS if the process dies while holding one
+    if fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+def _mutation(method):
+    # Wraps the public methods that change data. Called outside a
+    # transaction they run in one of their own. The top-level calls made in
+    # a transaction are recorded so the commit can re-apply them if another
+    # process changed the files after they were loaded.
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        if self._tx is None:
+            with self.transaction():
+                return wrapper(self, *args, **kwargs)
+        tx = self._tx
+        if tx["depth"] == 0:
+            tx["ops"].append((method.__name__, args, kwargs))
+        tx["depth"] += 1
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            tx["depth"] -= 1
+    return wrapper
+
+def _replay(grades, entries, student_id=None):
+    # apply journal entries to a dict of (student ID, subject code) -> Grade
+    for op, sid, *values in entries:
+        if student_id is not None and sid != student_id:
+            continue
+        if op == "put":
+            grades[(sid, values[0])] = Grade(sid, *values)
+        elif op == "del":
+            grades.pop((sid, values[0]), None)
+
+def _journal_cgpa(entries):
+    # student ID -> (cgpa, taken_ch, cgpa_ch) last journalled for it; an
+    # entry without the fields (the student was deleted) cancels earlier ones
+    cgpa = {}
+    for op, sid, *values in entries:
+        if op != "cgpa":
+            continue
+        if values:
+            cgpa[sid] = tuple(values)
+        else:
+            cgpa.pop(sid, None)
+    return cgpa
+
+def _with_cgpa(student, cgpa):
+    if student.id in cgpa:
+        student.cgpa, student.taken_ch, student.cgpa_ch = cgpa[student.id]
+    return student
+
+
+class DataStore:
+    def __init__(self, student_file=STUDENT_FILE, subject_file=SUBJECT_FILE, grade_file=GRADE_FILE):
+        self.student_file = student_file
+        self.subject_file = subject_file
+        self.grade_file = grade_file
+        self.journal = GradeJournal(grade_file + JOURNAL_SUFFIX)
+        self.lock_file = grade_file + LOCK_SUFFIX
+        self.conflicts = 0  # commits that had to be re-applied on newer data
+
+        self.students = {}
+        self.subjects = {}
+        self.grades = {}
+        self._grades_by_student = {}
+        self._grades_by_subject = {}
+        self._totals = None  # student ID -> CgpaTotals, built on first use
+
+        self._versions = {}
+        self._listeners = []
+        self._commit_listeners = []
+        self._tx = None  # staged writes and events of the open transaction
+
+    # ---------- change listeners ----------
+
+    def add_listener(self, listener):
+        self._listeners.append(listener)
+
+    def add_commit_listener(self, listener):
+        self._commit_listeners.append(listener)
+
+    def _notify_commit(self, events):
+        for listener in self._commit_listeners:
+            listener(events)
+
+    def _notify(self, kind, key, record):
+        if self._tx is not None:
+            self._tx["events"].append((kind, key, record))
+            return
+        for listener in self._listeners:
+            listener(kind, key, record)
+
+    # ---------- loading ----------
+
+    def _version(self, path):
+        # the grade data is the XML file plus its journal, and so are the
+        # students, whose CGPA fields are journalled with the grades
+        if path in (self.student_file, self.grade_file):
+            return (_file_version(path), _file_version(self.journal.path))
+        return _file_version(path)
+
+    def _refresh(self, path, loader, kind):
+        version = self._version(path)
+        if path in self._versions and (self._versions[path] == version or self._tx is not None):
+            return  # up to date, or a transaction is working on the loaded data
+        first_load = path not in self._versions
+        loader()
+        self._versions[path] = version
+        if not first_load:
+            self._notify(kind, None, None)
+
+    def _load_students(self):
+        self.students = {}
+        if not os.path.exists(self.student_file):
+            return
+        cgpa = _journal_cgpa(self.journal.read())
+        for s in _load_records(self.student_file, Student, iter_students):
+            self.students[s.id] = _with_cgpa(s, cgpa)
+
+    def _load_subjects(self):
+        self.subjects = {}
+        self._totals = None
+        if not os.path.exists(self.subject_file):
+            return
+        for s in _load_records(self.subject_file, Subject, iter_subjects):
+            self.subjects[s.code] = s
+
+    def _load_grades(self):
+        self.grades = {}
+        self._grades_by_student = {}
+        self._grades_by_subject = {}
+        self._totals = None
+        grades = {}
+        if os.path.exists(self.grade_file):
+            for g in _load_records(self.grade_file, Grade, _parse_grades):
+                grades[(g.student_id, g.subject_code)] = g
+        _replay(grades, self.journal.read())
+        for g in grades.values():
+            self._index_grade(g)
+
+    def _refresh_students(self):
+        self._refresh(self.student_file, self._load_students, "student")
+
+    def _refresh_subjects(self):
+        self._refresh(self.subject_file, self._load_subjects, "subject")
+
+    def _refresh_grades(self):
+        self._refresh(self.grade_file, self._load_grades, "grade")
+
+    # ---------- grade indexes ----------
+
+    def _index_grade(self, grade):
+        self.grades[(grade.student_id, grade.subject_code)] = grade
+        self._grades_by_student.setdefault(grade.student_id, {})[grade.subject_code] = grade
+        self._grades_by_subject.setdefault(grade.subject_code, {})[grade.student_id] = grade
+
+    def _unindex_grade(self, student_id, subject_code):
+        grade = self.grades.pop((student_id, subject_code), None)
+        if grade is None:
+            return None
+        per_student = self._grades_by_student[student_id]
+        del per_student[subject_code]
+        if not per_student:
+            del self._grades_by_student[student_id]
+        per_subject = self._grades_by_subject[subject_code]
+        del per_subject[student_id]
+        if not per_subject:
+            del self._grades_by_subject[subject_code]
+        return grade
+
+    # ---------- CGPA totals ----------
+
+    def _contribution(self, grade):
+        # (points, cgpa_ch, taken_ch) that one grade adds to its student
+        subject = self.subjects.get(grade.subject_code)
+        if subject is None:
+            return 0.0, 0, 0
+        credit_hour = subject.credit
+        if subject.grading == 'G':
+            return grade.gpa * credit_hour, credit_hour, credit_hour
+        return 0.0, 0, credit_hour
+
+    def _compute_totals(self, grades):
+        totals = {}
+        for grade in grades:
+            points, cgpa_ch, taken_ch = self._contribution(grade)
+            t = totals.setdefault(grade.student_id, CgpaTotals())
+            t.points += points
+            t.cgpa_ch += cgpa_ch
+            t.taken_ch += taken_ch
+        return totals
+
+    def _ensure_totals(self):
+        self._refresh_subjects()
+        self._refresh_grades()
+        if self._totals is None:
+            self._totals = self._compute_totals(self.grades.values())
+        return self._totals
+
+    def _apply_grade(self, grade, sign):
+        points, cgpa_ch, taken_ch = self._contribution(grade)
+        t = self._totals.setdefault(grade.student_id, CgpaTotals())
+        t.points += sign * points
+        t.cgpa_ch += sign * cgpa_ch
+        t.taken_ch += sign * taken_ch
+
+    def _sync_cgpa(self, student_id):
+        # copy the running totals into the student record, True if it changed
+        self._refresh_students()
+        student = self.students.get(student_id)
+        if student is None:
+            return False
+        t = self._ensure_totals().get(student_id, CgpaTotals())
+        fields = (round(t.cgpa, 2), t.taken_ch, t.cgpa_ch)
+        if (student.cgpa, student.taken_ch, student.cgpa_ch) == fields:
+            return False
+        student.cgpa, student.taken_ch, student.cgpa_ch = fields
+        self._notify("student", student_id, student)
+        return True
+
+    def _adjust_holders(self, code, change):
+        # re-apply the grades of one subject around a change to that subject
+        self._ensure_totals()
+        holders = list(self._grades_by_subject.get(code, {}).values())
+        for grade in holders:
+            self._apply_grade(grade, -1)
+        result = change()
+        for grade in holders:
+            self._apply_grade(grade, +1)
+        for grade in holders:
+            if self._sync_cgpa(grade.student_id):
+                self._log_cgpa(grade.student_id)
+        return result
+
+    def get_cgpa_totals(self, student_id):
+        return self._ensure_totals().get(student_id, CgpaTotals())
+
+    @_mutation
+    def update_cgpa(self, student_id):
+        if self._sync_cgpa(student_id):
+            self._log_cgpa(student_id)
+
+    @_mutation
+    def recompute_all_cgpa(self):
+        """Rebuild every student's CGPA totals in one pass over the grades
+        and journal the CGPA fields that changed. Returns the number of
+        student records whose CGPA or credit hours changed."""
+        self._refresh_subjects()
+        self._refresh_grades()
+        self._refresh_students()
+        self._totals = self._compute_totals(self.grades.values())
+        changed = [sid for sid in self.students if self._sync_cgpa(sid)]
+        for sid in changed:
+            self._log_cgpa(sid)
+        return len(changed)
+
+    def verify_cgpa(self, student_id=None):
+        """Recompute CGPA totals from scratch, streaming the grades as saved
+        (the grade file plus its journal, or the database), and compare them
+        with the running totals and the student records.
+
+        Returns a list of (student ID, expected CgpaTotals, running CgpaTotals)
+        for every student that does not match.
+        """
+        running = self._ensure_totals()
+        self._refresh_students()
+        if student_id is None:
+            student_ids = set(self.students) | set(running)
+        else:
+            student_ids = {student_id}
+        expected = self._compute_totals(self._stored_grades(student_id))
+
+        mismatches = []
+        for sid in sorted(student_ids):
+            want = expected.get(sid, CgpaTotals())
+            have = running.get(sid, CgpaTotals())
+            same = (
+                abs(want.points - have.points) < 1e-6
+                and want.cgpa_ch == have.cgpa_ch
+                and want.taken_ch == have.taken_ch
+            )
+            student = self.students.get(sid)
+            if student is not None:
+                same = same and (student.cgpa, student.taken_ch, student.cgpa_ch) == (
+                    round(want.cgpa, 2), want.taken_ch, want.cgpa_ch
+                )
+            if not same:
+                mismatches.append((sid, want, have))
+        return mismatches
+
+    def _stored_grades(self, student_id=None):
+        # the grades as saved, read straight from the grade file and journal
+        grades = iter_grades(student_id, path=self.grade_file)
+        entries = self.journal.read()
+        if entries:
+            # changes not yet compacted into the XML file
+            grades = {(g.student_id, g.subject_code): g for g in grades}
+            _replay(grades, entries, student_id)
+            grades = grades.values()
+        return grades
+
+    # ---------- saving ----------
+
+    def _write(self, path, root):
+        write_xml(path, root)
+        self._versions[path] = self._version(path)
+
+    def _save_students(self):
+        if self._tx is not None:
+            self._tx["save"].add("students")
+            return
+        self._write(self.student_file, students_xml(self.students.values()))
+        write_snapshot(self.student_file, Student, self.students.values())
+
+    def _save_subjects(self):
+        if self._tx is not None:
+            self._tx["save"].add("subjects")
+            return
+        self._write(self.subject_file, subjects_xml(self.subjects.values()))
+        write_snapshot(self.subject_file, Subject, self.subjects.values())
+
+    def _save_grades(self):
+        self._write(self.grade_file, grades_xml(self.grades.values()))
+        write_snapshot(self.grade_file, Grade, self.grades.values())
+
+    def _log_grade(self, *entries):
+        # record grade changes in the journal instead of rewriting the XML
+        if self._tx is not None:
+            self._tx["journal"].extend(entries)
+            return
+        self.journal.append(*entries)
+        self._journal_written()
+        if self.journal.entries >= JOURNAL_COMPACT_AT:
+            self._compact_grades()
+
+    def _log_cgpa(self, student_id):
+        # journal a student's new CGPA fields instead of rewriting students.xml;
+        # also done when a student is saved or deleted, so that entries from
+        # before then are not applied over the new record
+        student = self.students.get(student_id)
+        if student is None:
+            self._log_grade(["cgpa", student_id])
+        else:
+            self._log_grade(["cgpa", student_id, student.cgpa, student.taken_ch, student.cgpa_ch])
+
+    def _journal_written(self):
+        # the journal is part of the version of the grades and the students
+        for path in (self.grade_file, self.student_file):
+            if path in self._versions:
+                self._versions[path] = self._version(path)
+
+    def compact_grades(self):
+        """Write all grades to the grade XML file, and the journalled CGPA
+        fields to the student XML file, and empty the journal."""
+        with self._locked():
+            # include other processes' entries
+            self._refresh_grades()
+            self._refresh_students()
+            self._compact_grades()
+        # the records are the same, but files stamped with the version of
+        # the grade file have to be rewritten
+        self._notify_commit([("grade", None, None)])
+
+    def _compact_grades(self):
+        self.journal.sync()
+        self._save_grades()
+        if _journal_cgpa(self.journal.read()):
+            self._refresh_students()
+            self._write(self.student_file, students_xml(self.students.values()))
+            write_snapshot(self.student_file, Student, self.students.values())
+        self.journal.reset()
+        self._journal_written()
+
+    # ---------- transactions ----------
+
+    @contextmanager
+    def transaction(self):
+        """Group several changes into one commit.
+
+        Inside the block changes are made to the in-memory records as usual,
+        but nothing is written and listeners are not called. When the block
+        ends the grade changes are appended to the journal as one line and
+        students.xml / subjects.xml are each written once (temp file plus
+        rename), then the listeners get the buffered events in order. If the
+        block raises, or the commit fails, every change is rolled back and
+        the exception is passed on. A nested transaction joins the outer one.
+
+        The commit holds the write lock. If another process committed since
+        the files were loaded, the files are reloaded and the changes made in
+        the block are applied again on top, so neither commit is lost. If the
+        other process added a record the block adds too, ConflictError is
+        raised instead and nothing is saved.
+        """
+        if self._tx is not None:
+            yield self
+            return
+        self._refresh_loaded()
+        self._begin()
+        try:
+            yield self
+        except BaseException:
+            self._tx = None
+            self._rollback()
+            raise
+        tx, self._tx = self._tx, None
+        try:
+            with self._locked():
+                if self._stale():
+                    self.conflicts += 1
+                    tx = self._redo(tx)
+                self._commit(tx)
+        except BaseException:
+            self._tx = None
+            self._rollback(reloaded=True)
+            raise
+        for event in tx["events"]:
+            self._notify(*event)
+        if tx["events"]:
+            self._notify_commit(tx["events"])
+
+    def in_transaction(self):
+        """True inside a transaction() block, while its changes (and their
+        events) are not committed yet."""
+        return self._tx is not None
+
+    def _locked(self):
+        # held while committing, so commits from several processes take turns
+        return _write_lock(self.lock_file)
+
+    def _begin(self):
+        self._tx = {"save": set(), "journal": [], "events": [], "ops": [], "added": [], "depth": 0}
+
+    def _refresh_loaded(self):
+        # bring the files this store has loaded up to date
+        if self.student_file in self._versions:
+            self._refresh_students()
+        if self.subject_file in self._versions:
+            self._refresh_subjects()
+        if self.grade_file in self._versions:
+            self._refresh_grades()
+
+    def _stale(self):
+        return any(self._versions[path] != self._version(path) for path in self._versions)
+
+    def _redo(self, tx):
+        # reload the files and repeat the transaction's top-level calls,
+        # unless that would overwrite a record another process added
+        self._rollback(reloaded=True)
+        records = {"student": self.students, "subject": self.subjects, "grade": self.grades}
+        for kind, key in tx["added"]:
+            if key in records[kind]:
+                raise ConflictError(kind, key)
+        self._begin()
+        for name, args, kwargs in tx["ops"]:
+            getattr(self, name)(*args, **kwargs)
+        tx, self._tx = self._tx, None
+        return tx
+
+    def _commit(self, tx):
+        if tx["journal"]:
+            # flushed to the OS now, fsynced with the next batch
+            self._log_grade(*tx["journal"])
+        if "students" in tx["save"]:
+            self._save_students()
+        if "subjects" in tx["save"]:
+            self._save_subjects()
+
+    def _added(self, kind, key):
+        # note a new record, which must still be new if the commit is redone
+        self._tx["added"].append((kind, key))
+
+    def _rollback(self, reloaded=False):
+        # Nothing reached the files or the listeners during the transaction,
+        # so going back to the files restores the state before it began. If
+        # a commit failed part way, whatever it did write is what the files
+        # now hold, and the listeners are told to reload.
+        self._versions = {}
+        self._refresh_students()
+        self._refresh_subjects()
+        self._refresh_grades()
+        if reloaded:
+            for kind in ("student", "subject", "grade"):
+                self._notify(kind, None, None)
+
+    def data_version(self, kind):
+        """The version of the "student", "subject" or "grade" records as this
+        store last loaded or committed them (None if not loaded); it changes
+        whenever they change, in this process or another one."""
+        path = {"student": self.student_file, "subject": self.subject_file, "grade": self.grade_file}[kind]
+        return self._versions.get(path)
+
+    def saved_version(self, kind):
+        """The version of the saved "student", "subject" or "grade" records,
+        without loading them."""
+        path = {"student": self.student_file, "subject": self.subject_file, "grade": self.grade_file}[kind]
+        return self._version(path)
+
+    def close(self):
+        """Fold the grade changes this process journalled into the XML file."""
+        if self.journal.appended:
+            self.compact_grades()
+        self.journal.close()
+
+    # ---------- students ----------
+
+    def list_students(self):
+        self._refresh_students()
+        return list(self.students.values())
+
+    def get_student(self, student_id):
+        self._refresh_students()
+        return self.students.get(student_id)
+
+    def iter_students(self):
+        """Yield the saved students one at a time without loading them into
+        the store, for one-pass jobs such as reports."""
+        cgpa = _journal_cgpa(self.journal.read())
+        return (_with_cgpa(s, cgpa) for s in iter_students(self.student_file))
+
+    def next_student_id(self):
+        """One more than the highest student number in use. Deleted students
+        whose grades are still kept count as in use, so a new student never
+        takes over someone else's grades."""
+        self._refresh_students()
+        self._refresh_grades()
+        numbers = [int(sid[1:]) for ids in (self.students, self._grades_by_student) for sid in ids
+                   if sid[:1] == "S" and sid[1:].isdigit()]
+        return f"S{max(numbers, default=0) + 1:03}"
+
+    @_mutation
+    def add_student(self, student):
+        """Add a new student; DuplicateKeyError if the ID is taken."""
+        self._refresh_students()
+        if student.id in self.students:
+            raise DuplicateKeyError("student", student.id)
+        self.put_student(student)
+
+    @_mutation
+    def put_student(self, student):
+        """Add a student, or replace the student with the same ID."""
+        self._refresh_students()
+        if student.id not in self.students:
+            self._added("student", student.id)
+        self.students[student.id] = student
+        self._save_students()
+        self._log_cgpa(student.id)
+        self._notify("student", student.id, student)
+
+    @_mutation
+    def update_student(self, student_id, **fields):
+        self._refresh_students()
+        student = self.students.get(student_id)
+        if student is None:
+            return None
+        for field, value in fields.items():
+            setattr(student, field, value)
+        self._save_students()
+        self._log_cgpa(student_id)
+        self._notify("student", student_id, student)
+        return student
+
+    @_mutation
+    def delete_student(self, student_id):
+        self._refresh_students()
+        if self.students.pop(student_id, None) is None:
+            return False
+        self._save_students()
+        self._log_cgpa(student_id)
+        self._notify("student", student_id, None)
+        return True
+
+    # ---------- subjects ----------
+
+    def list_subjects(self):
+        self._refresh_subjects()
+        return list(self.subjects.values())
+
+    def get_subject(self, code):
+        self._refresh_subjects()
+        return self.subjects.get(code)
+
+    def iter_subjects(self):
+        """Yield the saved subjects one at a time, like iter_students()."""
+        return iter_subjects(self.subject_file)
+
+    @_mutation
+    def add_subject(self, subject):
+        self._refresh_subjects()
+        if subject.code not in self.subjects:
+            self._added("subject", subject.code)
+
+        def change():
+            self.subjects[subject.code] = subject
+
+        self._adjust_holders(subject.code, change)
+        self._save_subjects()
+        self._notify("subject", subject.code, subject)
+
+    @_mutation
+    def update_subject(self, code, **fields):
+        self._refresh_subjects()
+        subject = self.subjects.get(code)
+        if subject is None:
+            return None
+
+        def change():
+            for field, value in fields.items():
+                setattr(subject, field, value)
+
+        if any(getattr(subject, f) != fields[f] for f in ("credit", "grading") if f in fields):
+            self._adjust_holders(code, change)
+        else:
+            change()
+        self._save_subjects()
+        self._notify("subject", code, subject)
+        return subject
+
+    @_mutation
+    def delete_subject(self, code):
+        self._refresh_subjects()
+        if code not in self.subjects:
+            return False
+        self._adjust_holders(code, lambda: self.subjects.pop(code))
+        self._save_subjects()
+        self._notify("subject", code, None)
+        return True
+
+    # ---------- grades ----------
+
+    def list_grades(self):
+        self._refresh_grades()
+        return list(self.grades.values())
+
+    def get_grade(self, student_id, subject_code):
+        self._refresh_grades()
+        return self.grades.get((student_id, subject_code))
+
+    def has_grade(self, student_id, subject_code):
+        self._refresh_grades()
+        return (student_id, subject_code) in self.grades
+
+    def grades_for_student(self, student_id):
+        self._refresh_grades()
+        return list(self._grades_by_student.get(student_id, {}).values())
+
+    @_mutation
+    def add_grade(self, grade):
+        self._ensure_totals()
+        old = self._unindex_grade(grade.student_id, grade.subject_code)
+        if old is not None:
+            self._apply_grade(old, -1)
+        else:
+            self._added("grade", (grade.student_id, grade.subject_code))
+        self._index_grade(grade)
+        self._apply_grade(grade, +1)
+        self._log_grade(["put", grade.student_id, grade.subject_code, grade.mark, grade.grade_value, grade.gpa])
+        self._notify("grade", (grade.student_id, grade.subject_code), grade)
+        self.update_cgpa(grade.student_id)
+
+    @_mutation
+    def update_grade(self, student_id, subject_code, **fields):
+        self._ensure_totals()
+        grade = self.grades.get((student_id, subject_code))
+        if grade is None:
+            return None
+        # the record is shared by all indexes, so updating it in place
+        # keeps them in sync
+        self._apply_grade(grade, -1)
+        for field, value in fields.items():
+            setattr(grade, field, value)
+        self._apply_grade(grade, +1)
+        self._log_grade(["put", student_id, subject_code, grade.mark, grade.grade_value, grade.gpa])
+        self._notify("grade", (student_id, subject_code), grade)
+        self.update_cgpa(student_id)
+        return grade
+
+    @_mutation
+    def delete_grade(self, student_id, subject_code):
+        self._ensure_totals()
+        grade = self._unindex_grade(student_id, subject_code)
+        if grade is None:
+            return False
+        self._apply_grade(grade, -1)
+        self._log_grade(["del", student_id, subject_code])
+        self._notify("grade", (student_id, subject_code), None)
+        self.update_cgpa(student_id)
+        return True
+
+
+_store = None
+
+def get_store():
+    """Return the process-wide DataStore, creating it on first use."""
+    global _store
+    if _store is None:
+        if STORE_BACKEND == "sqlite":
+            from sqlite_store import SqliteStore
+            _store = SqliteStore()
+        else:
+            _store = DataStore()
+        atexit.register(_store.close)
+    return _store
@@ -0,0 +1,239 @@
+# Memory-mapped, fixed-width copy of the grade data for read-only jobs.
+#
+# data/grades.map holds one 16-byte record per grade:
+#   student code (int32), subject code (int32), mark (int16),
+#   credit hours (int8), graded (int8, 1 for grading type 'G'), gpa (float32)
+# after a fixed header, followed by the student ID and subject code tables
+# that the codes index into. Report and dashboard processes map the file
+# read-only, so every process shares the same page cache copy instead of
+# parsing grades.xml into a DOM of its own, and scan_grade_map() splits a
+# scan over a process pool.
+#
+# The process that changes the records keeps the file up to date: once it
+# exists, every commit that changes grades or subjects rewrites it (see
+# on_commit(), registered by grading_module.py), by writing a temporary file
+# and renaming it over the old one; processes that still map the old file
+# keep a consistent view. The file records the versions of the grade and
+# subject data it was made from, so a reader only has to compare those with
+# the files on disk, and builds the map itself only if it is missing or out
+# of date; the first report run creates it.
+#
+# Usage: python grade_map.py subjects
+#   prints grades, average mark and failures per subject from a parallel
+#   scan of the map, as a report process separate from the menu
+
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from data_store import *
+from grade_table import *
+
+MAP_MAGIC = b"GRADEMAP"
+MAP_VERSION = 2
+# magic, version, record count, offset of the ID tables
+HEADER = struct.Struct("<8sIQQ")
+HEADER_SIZE = 32
+RECORD = struct.Struct("<iihbbf")
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([
+        ("student", "<i4"), ("subject", "<i4"), ("mark", "<i2"),
+        ("credit", "i1"), ("graded", "i1"), ("gpa", "<f4"),
+    ])
+
+
+def _map_bytes(table):
+    # the records of a GradeTable packed in the file layout
+    count = len(table)
+    if count == 0:
+        return b""
+    if np is not None:
+        records = np.empty(count, dtype=RECORD_DTYPE)
+        subject = np.frombuffer(table.subject, dtype=np.intc)
+        records["student"] = np.frombuffer(table.student, dtype=np.intc)
+        records["subject"] = subject
+        records["mark"] = np.frombuffer(table.mark, dtype=np.intc)
+        records["credit"] = np.asarray(table.subject_credit, dtype=np.int8)[subject]
+        records["graded"] = np.asarray(table.subject_graded, dtype=np.int8)[subject]
+        records["gpa"] = np.frombuffer(table.gpa, dtype=np.float64)
+        return records.tobytes()
+    data = bytearray(RECORD.size * count)
+    for row in range(count):
+        subject = table.subject[row]
+        RECORD.pack_into(data, row * RECORD.size, table.student[row], subject, table.mark[row],
+                         table.subject_credit[subject], table.subject_graded[subject], table.gpa[row])
+    return bytes(data)
+
+
+def _source_version(store, saved=False):
+    # versions of the data a grade map is made from
+    version = store.saved_version if saved else store.data_version
+    return (version("subject"), version("grade"))
+
+
+def write_grade_map(path=GRADE_MAP_FILE):
+    """Regenerate the grade map from the data store."""
+    table = get_grade_table()
+    records = _map_bytes(table)
+    tables = pickle.dumps((list(table.student_ids), list(table.subject_codes), _source_version(get_store())),
+                          pickle.HIGHEST_PROTOCOL)
+    # a temporary file of its own, as several processes may write the map
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path) or ".", prefix=os.path.basename(path) + ".")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAP_MAGIC, MAP_VERSION, len(table), HEADER_SIZE + len(records)).ljust(HEADER_SIZE, b"\0"))
+            f.write(records)
+            f.write(tables)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        os.unlink(tmp)
+        raise
+
+
+class GradeMap:
+    """Read-only view of a grade map file."""
+
+    def __init__(self, path=GRADE_MAP_FILE):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, self.count, tables_offset = HEADER.unpack_from(self._mm)
+        if magic != MAP_MAGIC or version != MAP_VERSION:
+            self._mm.close()
+            raise ValueError(f"{path} is not a version {MAP_VERSION} grade map")
+        self.student_ids, self.subject_codes, self.source_version = pickle.loads(self._mm[tables_offset:])
+
+    def __len__(self):
+        return self.count
+
+    def close(self):
+        self._mm.close()
+
+    def records(self, start=0, stop=None):
+        """Records start..stop as a NumPy structured array sharing memory
+        with the map (requires NumPy)."""
+        stop = self.count if stop is None else min(stop, self.count)
+        return np.frombuffer(self._mm, dtype=RECORD_DTYPE, count=max(stop - start, 0),
+                             offset=HEADER_SIZE + start * RECORD.size)
+
+    def iter_records(self, start=0, stop=None):
+        """Yield records start..stop as (student, subject, mark, credit, graded, gpa) tuples."""
+        stop = self.count if stop is None else min(stop, self.count)
+        view = memoryview(self._mm)[HEADER_SIZE + start * RECORD.size:HEADER_SIZE + stop * RECORD.size]
+        try:
+            yield from RECORD.iter_unpack(view)
+        finally:
+            view.release()
+
+
+def on_commit(events, path=GRADE_MAP_FILE):
+    """Commit listener for the process that changes the records: rewrite
+    the grade map, if there is one, once per commit that changes grades or
+    subjects."""
+    if os.path.exists(path) and any(kind in ("grade", "subject") for kind, key, record in events):
+        write_grade_map(path)
+
+def get_grade_map(path=GRADE_MAP_FILE):
+    """Return a GradeMap of the current grades. Close it when done.
+
+    The data store is only loaded, to write the map, if the file is missing
+    or older than the grade and subject data on disk."""
+    try:
+        grade_map = GradeMap(path)
+        if grade_map.source_version == _source_version(get_store(), saved=True):
+            return grade_map
+        grade_map.close()
+    except (OSError, ValueError):
+        pass  # missing, or written by an older version
+    write_grade_map(path)
+    return GradeMap(path)
+
+
+# ---------- parallel scans ----------
+
+def _scan_chunk(start, stop, func):
+    grade_map = GradeMap()
+    rows = grade_map.records(start, stop) if np is not None else list(grade_map.iter_records(start, stop))
+    result = func(grade_map, rows)
+    del rows  # release the view before unmapping
+    grade_map.close()
+    return result
+
+def scan_grade_map(func, workers=None):
+    """Run func(grade_map, rows) over the grade map in a process pool.
+
+    The records are split into one contiguous chunk per worker; each worker
+    maps the file itself and gets its chunk as a NumPy structured array (or
+    a list of tuples without NumPy). func must be a top-level function.
+    Returns the list of per-chunk results in record order.
+    """
+    grade_map = get_grade_map()
+    count = len(grade_map)
+    grade_map.close()
+    workers = workers or os.cpu_count() or 1
+    size = max(-(-count // workers), 1)
+    bounds = [(start, min(start + size, count)) for start in range(0, count, size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_scan_chunk, start, stop, func) for start, stop in bounds]
+        return [future.result() for future in futures]
+
+def _subject_totals_chunk(grade_map, rows):
+    # {subject code: [grades, mark total, failures]} for one chunk
+    totals = {}
+    if np is not None:
+        groups = len(grade_map.subject_codes)
+        count = np.bincount(rows["subject"], minlength=groups)
+        marks = np.bincount(rows["subject"], weights=rows["mark"], minlength=groups)
+        failed = np.bincount(rows["subject"], weights=rows["gpa"] <= 0.0, minlength=groups)
+        for code in np.nonzero(count)[0]:
+            totals[grade_map.subject_codes[code]] = [int(count[code]), float(marks[code]), int(failed[code])]
+        return totals
+    for student, subject, mark, credit, graded, gpa in rows:
+        t = totals.setdefault(grade_map.subject_codes[subject], [0, 0.0, 0])
+        t[0] += 1
+        t[1] += mark
+        t[2] += gpa <= 0.0
+    return totals
+
+def subject_totals(workers=None):
+    """Return {subject code: (grades, average mark, failures)} from a
+    parallel scan of the grade map."""
+    combined = {}
+    for chunk in scan_grade_map(_subject_totals_chunk, workers):
+        for code, (count, marks, failed) in chunk.items():
+            t = combined.setdefault(code, [0, 0.0, 0])
+            t[0] += count
+            t[1] += marks
+            t[2] += failed
+    return {code: (count, marks / count, failed) for code, (count, marks, failed) in sorted(combined.items())}
+
+def show_subject_report(workers=None):
+    totals = subject_totals(workers)
+    print("\nGrades per Subject")
+    print("-" * 50)
+    print(f"{'Subject':<12}{'Grades':<9}{'Avg Mark':<11}{'Failures':<10}{'Fail Rate':<10}")
+    print("-" * 50)
+    for code, (count, average, failed) in totals.items():
+        print(f"{code:<12}{count:<9}{average:<11.2f}{failed:<10}{failed / count:<10.1%}")
+    print("-" * 50)
+
+# python grade_map.py subjects prints the subject report; otherwise redirect
+# to main.py
+if __name__ == "__main__":
+    if sys.argv[1:] == ["subjects"]:
+        import grade_map  # so the pool workers find the scan functions by module name
+        grade_map.show_subject_report()
+    else:
+        import main
+        main.main()
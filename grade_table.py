@@ -0,0 +1,294 @@
+# Columnar grade table for cohort analytics.
+#
+# Student IDs, subject codes and programmes are interned into small integer
+# codes and every grade is one row across a set of typed arrays:
+#   student, subject : interned codes (array 'i')
+#   mark             : mark (array 'i')
+#   gpa              : grade point (array 'd')
+# with per-subject credit hours / grading type and per-student programme
+# kept in arrays indexed by those codes. Group-by queries (per subject, per
+# student, per programme) are answered with NumPy bincounts over zero-copy
+# views of the arrays, or with a plain loop when NumPy is not installed.
+# The table follows store change events, so it is built only once per run.
+
+from array import array
+from collections import namedtuple
+
+_np = None  # NumPy, imported by _numpy() when first needed
+
+from data_store import *
+
+GROUP_BY = ("subject", "student", "programme")
+
+# One row of a group-by. avg_gpa is weighted by credit hours over the graded
+# ('G') subjects only, so per student it is the CGPA.
+GroupStats = namedtuple("GroupStats", "key count avg_mark avg_gpa failures fail_rate")
+
+MARK_BANDS = [(low, low + 9) for low in range(0, 90, 10)] + [(90, 100)]
+
+
+def _numpy():
+    # NumPy is optional and slow to import; return it, or None if it is not
+    # installed
+    global _np
+    if _np is None:
+        try:
+            import numpy
+        except ImportError:
+            numpy = False
+        _np = numpy
+    return _np or None
+
+
+def _view(column, dtype):
+    # NumPy array sharing memory with an array.array column
+    if len(column) == 0:
+        return _np.zeros(0, dtype)
+    return _np.frombuffer(column, dtype=dtype)
+
+
+class GradeTable:
+    def __init__(self, store):
+        self.store = store
+        self._build()
+
+    def __len__(self):
+        return len(self._keys)
+
+    def _build(self):
+        self.student_ids = []   # student code -> student ID
+        self.subject_codes = []  # subject code -> subject code string
+        self.programmes = []    # programme code -> programme name
+        self._student_index = {}
+        self._subject_index = {}
+        self._programme_index = {}
+        self.student_programme = array('i')  # per student code
+        self.subject_credit = array('i')     # per subject code
+        self.subject_graded = array('b')     # per subject code, 1 for grading 'G'
+
+        self.student = array('i')
+        self.subject = array('i')
+        self.mark = array('i')
+        self.gpa = array('d')
+        self._keys = []  # row -> (student ID, subject code)
+        self._rows = {}  # (student ID, subject code) -> row
+
+        for grade in self.store.list_grades():
+            self._set_grade((grade.student_id, grade.subject_code), grade)
+
+    # ---------- interning ----------
+
+    def _programme_code(self, programme):
+        code = self._programme_index.get(programme)
+        if code is None:
+            code = self._programme_index[programme] = len(self.programmes)
+            self.programmes.append(programme)
+        return code
+
+    def _student_programme_code(self, student_id):
+        student = self.store.get_student(student_id)
+        return self._programme_code(student.programme if student is not None else "Unknown")
+
+    def _student_code(self, student_id):
+        code = self._student_index.get(student_id)
+        if code is None:
+            code = self._student_index[student_id] = len(self.student_ids)
+            self.student_ids.append(student_id)
+            self.student_programme.append(self._student_programme_code(student_id))
+        return code
+
+    def _subject_code(self, subject_code):
+        code = self._subject_index.get(subject_code)
+        if code is None:
+            code = self._subject_index[subject_code] = len(self.subject_codes)
+            self.subject_codes.append(subject_code)
+            self.subject_credit.append(0)
+            self.subject_graded.append(0)
+            self._set_subject(code, self.store.get_subject(subject_code))
+        return code
+
+    def _set_subject(self, code, subject):
+        self.subject_credit[code] = subject.credit if subject is not None else 0
+        self.subject_graded[code] = 1 if subject is not None and subject.grading == 'G' else 0
+
+    # ---------- keeping in sync ----------
+
+    def _set_grade(self, key, grade):
+        row = self._rows.get(key)
+        if grade is None:
+            if row is not None:
+                self._remove_row(row)
+            return
+        student = self._student_code(grade.student_id)
+        subject = self._subject_code(grade.subject_code)
+        if row is None:
+            self._rows[key] = len(self._keys)
+            self._keys.append(key)
+            self.student.append(student)
+            self.subject.append(subject)
+            self.mark.append(grade.mark)
+            self.gpa.append(grade.gpa)
+        else:
+            self.mark[row] = grade.mark
+            self.gpa[row] = grade.gpa
+
+    def _remove_row(self, row):
+        # move the last row into the hole so the columns stay dense
+        last = len(self._keys) - 1
+        del self._rows[self._keys[row]]
+        if row != last:
+            moved = self._keys[last]
+            self._keys[row] = moved
+            self._rows[moved] = row
+            for column in (self.student, self.subject, self.mark, self.gpa):
+                column[row] = column[last]
+        self._keys.pop()
+        for column in (self.student, self.subject, self.mark, self.gpa):
+            column.pop()
+
+    def on_change(self, kind, key, record):
+        if kind == "grade":
+            if key is None:
+                self._build()
+            else:
+                self._set_grade(key, record)
+        elif kind == "student":
+            if key is None:
+                for code, student_id in enumerate(self.student_ids):
+                    self.student_programme[code] = self._student_programme_code(student_id)
+            elif key in self._student_index:
+                self.student_programme[self._student_index[key]] = self._student_programme_code(key)
+        elif kind == "subject":
+            if key is None:
+                for code, subject_code in enumerate(self.subject_codes):
+                    self._set_subject(code, self.store.get_subject(subject_code))
+            elif key in self._subject_index:
+                self._set_subject(self._subject_index[key], record)
+
+    # ---------- queries ----------
+
+    def _group_labels(self, by):
+        if by == "subject":
+            return self.subject_codes
+        if by == "student":
+            return self.student_ids
+        if by == "programme":
+            return self.programmes
+        raise ValueError(f"group by must be one of {GROUP_BY}, not {by!r}")
+
+    def _totals_numpy(self, by, groups):
+        subject = _view(self.subject, _np.intc)
+        student = _view(self.student, _np.intc)
+        if by == "subject":
+            codes = subject
+        elif by == "student":
+            codes = student
+        else:
+            codes = _view(self.student_programme, _np.intc)[student]
+        gpa = _view(self.gpa, _np.float64)
+        weight = (_view(self.subject_credit, _np.intc) * _view(self.subject_graded, _np.int8))[subject]
+        return (
+            _np.bincount(codes, minlength=groups),
+            _np.bincount(codes, weights=_view(self.mark, _np.intc), minlength=groups),
+            _np.bincount(codes, weights=gpa * weight, minlength=groups),
+            _np.bincount(codes, weights=weight, minlength=groups),
+            _np.bincount(codes, weights=gpa <= 0.0, minlength=groups),
+        )
+
+    def _totals_python(self, by, groups):
+        count = [0] * groups
+        marks = [0.0] * groups
+        points = [0.0] * groups
+        graded_ch = [0.0] * groups
+        failures = [0] * groups
+        for row in range(len(self._keys)):
+            subject = self.subject[row]
+            if by == "subject":
+                code = subject
+            elif by == "student":
+                code = self.student[row]
+            else:
+                code = self.student_programme[self.student[row]]
+            weight = self.subject_credit[subject] * self.subject_graded[subject]
+            gpa = self.gpa[row]
+            count[code] += 1
+            marks[code] += self.mark[row]
+            points[code] += gpa * weight
+            graded_ch[code] += weight
+            failures[code] += gpa <= 0.0
+        return count, marks, points, graded_ch, failures
+
+    def group_stats(self, by):
+        """Return [GroupStats] for every subject, student or programme that
+        has grades, in key order."""
+        labels = self._group_labels(by)
+        totals = self._totals_numpy if _numpy() is not None else self._totals_python
+        count, marks, points, graded_ch, failures = totals(by, len(labels))
+        result = []
+        for code, label in enumerate(labels):
+            n = int(count[code])
+            if n == 0:
+                continue
+            avg_gpa = points[code] / graded_ch[code] if graded_ch[code] > 0 else 0.0
+            result.append(GroupStats(label, n, float(marks[code]) / n, float(avg_gpa),
+                                     int(failures[code]), int(failures[code]) / n))
+        result.sort()
+        return result
+
+    def mark_distribution(self, subject_code=None):
+        """Return the number of marks in each of MARK_BANDS, for one subject
+        or for every grade."""
+        if subject_code is not None and subject_code not in self._subject_index:
+            return [0] * len(MARK_BANDS)
+        if _numpy() is not None:
+            marks = _view(self.mark, _np.intc)
+            if subject_code is not None:
+                marks = marks[_view(self.subject, _np.intc) == self._subject_index[subject_code]]
+            bands = _np.clip(marks, 0, 100) // 10
+            bands = _np.minimum(bands, len(MARK_BANDS) - 1)
+            return [int(n) for n in _np.bincount(bands, minlength=len(MARK_BANDS))]
+        counts = [0] * len(MARK_BANDS)
+        wanted = self._subject_index.get(subject_code)
+        for row in range(len(self._keys)):
+            if wanted is None or self.subject[row] == wanted:
+                band = min(max(self.mark[row], 0), 100) // 10
+                counts[min(band, len(MARK_BANDS) - 1)] += 1
+        return counts
+
+
+_grade_table = None
+
+def get_grade_table():
+    """Return the process-wide GradeTable, building it on first use."""
+    global _grade_table
+    if _grade_table is None:
+        store = get_store()
+        _grade_table = GradeTable(store)
+        store.add_listener(_grade_table.on_change)
+    return _grade_table
+
+def show_group_stats(by):
+    title = {"subject": "Subject", "student": "Student", "programme": "Programme"}[by]
+    width = 35 if by == "programme" else 12
+    print(f"\nCohort Analytics by {title}")
+    print("-" * (width + 55))
+    print(f"{title:<{width}}{'Grades':<9}{'Avg Mark':<11}{'Avg GPA':<10}{'Failures':<10}{'Fail Rate':<10}")
+    print("-" * (width + 55))
+    for row in get_grade_table().group_stats(by):
+        print(f"{row.key:<{width}}{row.count:<9}{row.avg_mark:<11.2f}{row.avg_gpa:<10.2f}{row.failures:<10}{row.fail_rate:<10.1%}")
+    print("-" * (width + 55))
+
+def show_mark_distribution(subject_code=None):
+    counts = get_grade_table().mark_distribution(subject_code)
+    total = sum(counts)
+    print(f"\nMark Distribution ({subject_code or 'All Subjects'})")
+    print("-" * 60)
+    for (low, high), n in zip(MARK_BANDS, counts):
+        bar = "#" * (round(40 * n / total) if total else 0)
+        print(f"{low:>3}-{high:<5}{n:>6}  {bar}")
+    print("-" * 60)
+
+# If this file is executed, redirect to main.py
+if __name__ == "__main__":
+    import main
+    main.main()
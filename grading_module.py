@@ -1,11 +1,13 @@
 import xml.etree.ElementTree as ET
 import os
-from fpdf import FPDF
+import time
 
-from student_module import *
-from subject_module import *
+from data_store import *
 from rdf_utils import *
 from grading_share_utils import *
+from prereq_graph import *
+from dashboard_utils import *
+from grade_table import *
 
 # This function is used to clear the screen
 def clear_screen():
@@ -15,55 +17,32 @@ STUDENT_FILE = "data/students.xml"
 SUBJECT_FILE = "data/subjects.xml"
 GRADE_FILE = "data/grades.xml"
 
-def generate_result_slip(student_id):
-    # Load student info
-    stu_tree = ET.parse(STUDENT_FILE)
-    stu_root = stu_tree.getroot()
-    student = None
-    for s in stu_root.findall("student"):
-        if s.get("id") == student_id:
-            student = s
-            break
+# A grade map (see grade_map.py) made by the dashboards is kept up to date by
+# the process that changes the grades, once per commit. grade_map loads
+# NumPy, so it is only imported when there is a map to update.
+def _update_grade_map(events):
+    if os.path.exists(GRADE_MAP_FILE):
+        import grade_map
+        grade_map.on_commit(events)
 
-    if student is None:
-        print("Student not found.")
-        return
+get_store().add_commit_listener(_update_grade_map)
 
-    name = student.find("name").text
-    programme = student.find("programme").text
-    email = student.find("email").text
-    taken_ch = student.find("taken_CH").text
-    cgpa = student.find("cgpa").text
-
-    # Load subject info into a dict
-    subj_tree = ET.parse(SUBJECT_FILE)
-    subj_root = subj_tree.getroot()
-    subject_dict = {}
-    for subj in subj_root.findall("subject"):
-        code = subj.get("code")
-        subject_dict[code] = {
-            "name": subj.find("name").text,
-            "credit": subj.find("credit").text
-        }
+def _result_slip_rows(student_id, subject_dict):
+    # (code, subject name, credit hour, mark, grade) for each of the student's grades
+    rows = []
+    for g in get_store().grades_for_student(student_id):
+        subject_name, credit = subject_dict.get(g.subject_code, ("Unknown", 0))
+        rows.append((g.subject_code, subject_name, credit, g.mark, g.grade_value))
+    return rows
 
-    # Load grades
-    grade_tree = ET.parse(GRADE_FILE)
-    grade_root = grade_tree.getroot()
-    student_grades = []
-    for g in grade_root.findall("grade"):
-        if g.get("student_id") == student_id:
-            code = g.get("subject_code")
-            mark = g.find("mark").text
-            grade = g.find("grade_value").text
-            subject_name = subject_dict[code]["name"] if code in subject_dict else "Unknown"
-            credit = subject_dict[code]["credit"] if code in subject_dict else "0"
-            student_grades.append((code, subject_name, credit, mark, grade))
+def _slip_subject_dict():
+    return {s.code: (s.name, s.credit) for s in get_store().list_subjects()}
 
-    if not student_grades:
-        print("No grades found for this student.")
-        return
+def _render_result_slip(info, student_grades, output_path):
+    from fpdf import FPDF  # imported on first use, it is slow to load
+
+    student_id, name, programme, email, taken_ch, cgpa = info
 
-    # Generate PDF
     pdf = FPDF()
     pdf.add_page()
     pdf.set_font("Courier", "B", 14)
@@ -78,7 +57,7 @@ def generate_result_slip(student_id):
     pdf.cell(0, 10, f"{'Student Email'.ljust(label_width)}: {email}", ln=True)
     pdf.cell(0, 10, f"{'Programme'.ljust(label_width)}: {programme}", ln=True)
     pdf.cell(0, 10, f"{'Taken Credit Hours'.ljust(label_width)}: {taken_ch}", ln=True)
-    pdf.cell(0, 10, f"{'CGPA'.ljust(label_width)}: {cgpa} / 4.00", ln=True)
+    pdf.cell(0, 10, f"{'CGPA'.ljust(label_width)}: {cgpa:.2f} / 4.00", ln=True)
     pdf.ln(10)
 
     # Table headers
@@ -96,10 +75,93 @@ def generate_result_slip(student_id):
             pdf.cell(widths[i], 10, str(row[i]), 1)
         pdf.ln()
 
-    output_path = f"report/resultslip_{student_id}.pdf"
     pdf.output(output_path)
+    return output_path
+
+def _student_info(student):
+    return (student.id, student.name, student.programme, student.email, student.taken_ch, student.cgpa)
+
+def generate_result_slip(student_id):
+    # Load student info
+    student = get_store().get_student(student_id)
+    if student is None:
+        print("Student not found.")
+        return
+
+    # Load grades
+    student_grades = _result_slip_rows(student_id, _slip_subject_dict())
+    if not student_grades:
+        print("No grades found for this student.")
+        return
+
+    # Generate PDF
+    output_path = _render_result_slip(_student_info(student), student_grades, f"report/resultslip_{student_id}.pdf")
     print(f"\nResult slip generated: {output_path}")
 
+# Subject dict shared by every slip rendered in a batch worker process
+_worker_subject_dict = None
+
+def _init_slip_worker(subject_dict):
+    global _worker_subject_dict
+    _worker_subject_dict = subject_dict
+
+def _render_slip_job(info, grades):
+    # grades are (code, mark, grade) tuples; the subject columns come from
+    # the dict the worker was started with
+    rows = []
+    for code, mark, grade in grades:
+        subject_name, credit = _worker_subject_dict.get(code, ("Unknown", 0))
+        rows.append((code, subject_name, credit, mark, grade))
+    return _render_result_slip(info, rows, f"report/resultslip_{info[0]}.pdf")
+
+def generate_result_slips(programme=None, id_from=None, id_to=None, workers=None):
+    """Generate result slips for every student, or for one programme and/or
+    an inclusive student ID range, rendering the PDFs in a process pool.
+
+    Returns the number of slips generated.
+    """
+    from concurrent.futures import ProcessPoolExecutor, as_completed
+
+    store = get_store()
+    start = time.perf_counter()
+
+    jobs = []
+    for student in store.list_students():
+        if programme and student.programme != programme:
+            continue
+        if id_from and student.id < id_from:
+            continue
+        if id_to and student.id > id_to:
+            continue
+        grades = [(g.subject_code, g.mark, g.grade_value) for g in store.grades_for_student(student.id)]
+        if grades:
+            jobs.append((_student_info(student), grades))
+
+    if not jobs:
+        print("No students with grades match the selection.")
+        return 0
+
+    done = 0
+    failed = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_slip_worker,
+                             initargs=(_slip_subject_dict(),)) as executor:
+        futures = {executor.submit(_render_slip_job, info, grades): info[0] for info, grades in jobs}
+        for future in as_completed(futures):
+            try:
+                future.result()
+                done += 1
+            except Exception as exc:
+                failed += 1
+                print(f"\nFailed to generate result slip for {futures[future]}: {exc}")
+            print(f"\rGenerating result slips... {done + failed}/{len(jobs)}", end="", flush=True)
+
+    elapsed = time.perf_counter() - start
+    rate = done / elapsed if elapsed > 0 else 0.0
+    print(f"\n{done} result slip(s) generated in report/ in {elapsed:.2f}s ({rate:.1f} slips/sec).")
+    if failed:
+        print(f"{failed} result slip(s) failed.")
+    return done
+
 def init_grade_xml():
     if not os.path.exists(GRADE_FILE):
         root = ET.Element("grades")
@@ -107,18 +169,46 @@ def init_grade_xml():
         tree.write(GRADE_FILE)
 
 def get_students():
-    tree = ET.parse(STUDENT_FILE)
-    return tree.getroot().findall("student")
+    return get_store().list_students()
 
 def get_subjects():
-    tree = ET.parse(SUBJECT_FILE)
-    return tree.getroot().findall("subject")
+    return get_store().list_subjects()
+
+def classify_subjects(student_id, student_programme, subjects, skip_graded=True):
+    """Split subjects into (eligible, ineligible) for the student.
+
+    Subjects from other programmes are left out, ineligible holds
+    (subject, prerequisite) pairs whose prerequisite is not met yet,
+    and subjects already graded are skipped unless skip_graded is False.
+    """
+    store = get_store()
+    graph = get_prerequisite_graph()
+    passed = graph.passed(student_id)
+    eligible = []
+    ineligible = []
+
+    for subj in subjects:
+        if not offered_to(subj, student_programme):
+            continue
+
+        if not graph.is_eligible(subj.code, passed):
+            ineligible.append((subj, subj.prerequisite))
+            continue
+
+        # Avoid re-adding a subject with existing grade
+        if skip_graded and store.has_grade(student_id, subj.code):
+            continue
+
+        eligible.append(subj)
+
+    return eligible, ineligible
 
 def add_grade():
+    store = get_store()
     students = get_students()
     clear_screen()
     for idx, s in enumerate(students):
-        print(f"{idx+1}. {s.get('id')} - {s.find('name').text}")
+        print(f"{idx+1}. {s.id} - {s.name}")
     while True:
         try:
             sidx = int(input("Select student: ")) - 1
@@ -130,136 +220,110 @@ def add_grade():
             print("Invalid input. Please enter a number.\n")
 
     student = students[sidx]
-    student_id = student.get("id")
-    student_name = student.find("name").text
-    student_programme = student.find("programme").text.strip() if student.find("programme") is not None else ""
+    student_id = student.id
+    student_name = student.name
+    student_programme = student.programme
 
     clear_screen()
     print(f"\nAdding grades for: {student_name}\n")
 
     # Filter and classify subjects
     all_subjects = get_subjects()
-    eligible_subjects = []
-    ineligible_subjects = []  # subjects not passed prerequisites
-
-    for subj in all_subjects:
-        subj_prog = subj.find("programme").text.strip() if subj.find("programme") is not None else "For All Programmes"
-        if subj_prog not in [student_programme, "For All Programmes", "All"]:
-            continue
-
-        prerequisite = subj.find("prerequisite")
-        if prerequisite is not None and prerequisite.text and prerequisite.text.strip():
-            prereq_code = prerequisite.text.strip()
-            if not has_passed(student_id, prereq_code):
-                ineligible_subjects.append((subj, prereq_code))
-                continue
-
-        eligible_subjects.append(subj)
+    eligible_subjects, ineligible_subjects = classify_subjects(
+        student_id, student_programme, all_subjects, skip_graded=False
+    )
 
     if not eligible_subjects:
         print("\nNo eligible subjects found for this student.")
         return
 
-    while True:
-        # Re-filter subjects every time to account for newly added grades
-        eligible_subjects = []
-        ineligible_subjects = []
-
-        for subj in all_subjects:
-            subj_prog = subj.find("programme").text.strip() if subj.find("programme") is not None else "For All Programmes"
-            if subj_prog not in [student_programme, "For All Programmes", "All"]:
-                continue
-
-            prerequisite = subj.find("prerequisite")
-            if prerequisite is not None and prerequisite.text and prerequisite.text.strip():
-                prereq_code = prerequisite.text.strip()
-                if not has_passed(student_id, prereq_code):
-                    ineligible_subjects.append((subj, prereq_code))
-                    continue
-
-            # Avoid re-adding a subject with existing grade
-            grade_tree = ET.parse(GRADE_FILE)
-            existing = grade_tree.getroot().find(f"./grade[@student_id='{student_id}'][@subject_code='{subj.get('code')}']")
-            if existing is None:
-                eligible_subjects.append(subj)
-
-        if not eligible_subjects:
-            print("\nNo more eligible subjects available for this student.")
-            break
-
-        print("Available subjects:\n")
-        for idx, s in enumerate(eligible_subjects):
-            print(f"{idx+1}. {s.get('code')}: {s.find('name').text}")
-
-        if ineligible_subjects:
-            print("\nSubjects not shown due to unmet prerequisites:")
-            for s, prereq in ineligible_subjects:
-                print(f"- {s.get('code')} ({s.find('name').text}) requires {prereq}")
-
-        try:
-            subidx = int(input("\nSelect subject: ")) - 1
-            if not (0 <= subidx < len(eligible_subjects)):
-                print("Invalid number. Please select a valid subject number.\n")
-                continue
-        except ValueError:
-            print("Invalid input. Please enter a number.\n")
-            continue
-
-        subject = eligible_subjects[subidx]
-        subject_code = subject.get("code")
-        subject_name = subject.find("name").text
-        credit_hour = int(subject.find("credit").text)
-        grading_type = subject.find("grading").text
-
-        # Check if grade already exists
-        grade_tree = ET.parse(GRADE_FILE)
-        grade_root = grade_tree.getroot()
-        existing = grade_root.find(f"./grade[@student_id='{student_id}'][@subject_code='{subject_code}']")
-        if existing is not None:
-            print(f"\nGrade for {subject_code} already exists for {student_name}.")
-            print("Use 'edit marks' to modify it.\n")
-            continue
+    # All marks entered for this student are saved together when the
+    # session ends; an error or Ctrl+C part way discards them all.
+    try:
+        with store.transaction():
+            while True:
+                # Re-filter subjects every time to account for newly added grades
+                eligible_subjects, ineligible_subjects = classify_subjects(
+                    student_id, student_programme, all_subjects
+                )
 
-        # Get mark
-        while True:
-            mark = input("Enter mark (0-100): ")
-            if mark.isdigit() and 0 <= int(mark) <= 100:
-                break
-            print("Invalid mark. Enter a number between 0 and 100.")
+                if not eligible_subjects:
+                    print("\nNo more eligible subjects available for this student.")
+                    break
 
-        grade, gpa = calculate_grade(mark, grading_type)
+                print("Available subjects:\n")
+                for idx, s in enumerate(eligible_subjects):
+                    print(f"{idx+1}. {s.code}: {s.name}")
+
+                if ineligible_subjects:
+                    print("\nSubjects not shown due to unmet prerequisites:")
+                    for s, prereq in ineligible_subjects:
+                        print(f"- {s.code} ({s.name}) requires {prereq}")
+
+                try:
+                    subidx = int(input("\nSelect subject: ")) - 1
+                    if not (0 <= subidx < len(eligible_subjects)):
+                        print("Invalid number. Please select a valid subject number.\n")
+                        continue
+                except ValueError:
+                    print("Invalid input. Please enter a number.\n")
+                    continue
 
-        # Save grade
-        record = ET.SubElement(grade_root, "grade", student_id=student_id, subject_code=subject_code)
-        ET.SubElement(record, "mark").text = mark
-        ET.SubElement(record, "grade_value").text = grade
-        ET.SubElement(record, "gpa").text = str(gpa)
-        grade_tree.write(GRADE_FILE)
+                subject = eligible_subjects[subidx]
+                subject_code = subject.code
+                subject_name = subject.name
+                credit_hour = subject.credit
+                grading_type = subject.grading
 
-        # Display summary
-        clear_screen()
-        print("\nMarks Added. Summary below:")
-        print(f"Student: {student_name}")
-        print("=" * 56)
-        print(f"{'Subject Code':<15}{'Mark':<10}{'Grade':<10}{'GPA':<10}{'Credit Hour':<15}")
-        print(f"{subject_code:<15}{str(mark) + '%':<10}{grade:<10}{gpa:<10.2f}{credit_hour:<15}")
-        print("=" * 56)
-
-        # Update CGPA and display updated info
-        update_cgpa(student_id)
-        student_tree = ET.parse(STUDENT_FILE)
-        for stu in student_tree.getroot().findall("student"):
-            if stu.get("id") == student_id:
-                cgpa = stu.find("cgpa").text
-                taken_CH = stu.find("taken_CH").text
-                break
+                # Check if grade already exists
+                if store.has_grade(student_id, subject_code):
+                    print(f"\nGrade for {subject_code} already exists for {student_name}.")
+                    print("Use 'edit marks' to modify it.\n")
+                    continue
 
-        print(f"\n{'Total Taken Credit Hours':<25}: {taken_CH}")
-        print(f"{'Latest CGPA':<25}: {cgpa}")
+                # Get mark
+                while True:
+                    mark = input("Enter mark (0-100): ")
+                    if mark.isdigit() and 0 <= int(mark) <= 100:
+                        break
+                    print("Invalid mark. Enter a number between 0 and 100.")
+
+                grade, gpa = calculate_grade(mark, grading_type)
+
+                # Save grade
+                store.add_grade(Grade(
+                    student_id=student_id,
+                    subject_code=subject_code,
+                    mark=int(mark),
+                    grade_value=grade,
+                    gpa=gpa
+                ))
+
+                # Display summary
+                clear_screen()
+                print("\nMarks Added. Summary below:")
+                print(f"Student: {student_name}")
+                print("=" * 56)
+                print(f"{'Subject Code':<15}{'Mark':<10}{'Grade':<10}{'GPA':<10}{'Credit Hour':<15}")
+                print(f"{subject_code:<15}{str(mark) + '%':<10}{grade:<10}{gpa:<10.2f}{credit_hour:<15}")
+                print("=" * 56)
+
+                # CGPA is updated by the store together with the grade
+                updated = store.get_student(student_id)
+                cgpa = updated.cgpa
+                taken_CH = updated.taken_ch
+
+                print(f"\n{'Total Taken Credit Hours':<25}: {taken_CH}")
+                print(f"{'Latest CGPA':<25}: {cgpa:.2f}")
+
+                again = input(f"\nAdd another mark for {student_name}? (y/n): ").strip().lower()
+                if again != 'y':
+                    break
+    except ConflictError as e:
+        # another operator entered a mark for the same subject meanwhile
+        print(f"\nMarks not saved: {e}.")
+        print("None of the marks entered in this session were saved; please check the grades and enter them again.")
 
-        again = input(f"\nAdd another mark for {student_name}? (y/n): ").strip().lower()
-        if again != 'y':
-            break
 
 def display_grades():
     students = get_students()
@@ -267,16 +331,14 @@ def display_grades():
 
     # Create a lookup dictionary for subject details
     subject_dict = {
-        s.get("code"): {
-            "name": s.find("name").text,
-            "credit": s.find("credit").text,
-            "grading": s.find("grading").text
+        s.code: {
+            "name": s.name,
+            "credit": s.credit,
+            "grading": s.grading
         } for s in subjects
     }
 
-    # Load grade records
-    grade_tree = ET.parse(GRADE_FILE)
-    grade_root = grade_tree.getroot()
+    store = get_store()
 
     clear_screen()
     print("Display All Marks")
@@ -284,24 +346,22 @@ def display_grades():
     
 
     for idx, student in enumerate(students, start=1):
-        student_id = student.get("id")
-        student_name = student.find("name").text
-        taken_CH = student.find("taken_CH").text
-        cgpa = student.find("cgpa").text
+        student_id = student.id
+        student_name = student.name
+        taken_CH = student.taken_ch
+        cgpa = student.cgpa
 
-        grades_found = False
-        for record in grade_root.findall(f"./grade[@student_id='{student_id}']"):
-            grades_found = True
+        records = store.grades_for_student(student_id)
+        grades_found = len(records) > 0
 
         if grades_found == True:
             print("-" * 105)
-            print(f" {student_id}: {student_name:<61}  Total Credit Hours: {taken_CH:<2}, CGPA: {cgpa}")
+            print(f" {student_id}: {student_name:<61}  Total Credit Hours: {taken_CH:<2}, CGPA: {cgpa:.2f}")
             print("-" * 105)
             print(f"{'Code':<10}{'Subject Name':<45}{'Credit Hours':<15}{'Grade Mode':<14}{'Mark':<8}{'Grade':<8}{'GPA':<8}")
 
-        for record in grade_root.findall(f"./grade[@student_id='{student_id}']"):
-            grades_found = True
-            subject_code = record.get("subject_code")
+        for record in records:
+            subject_code = record.subject_code
             subject = subject_dict.get(subject_code)
 
             if subject:
@@ -319,9 +379,9 @@ def display_grades():
                 credit = "?"
                 grading = "?"
 
-            mark = record.find("mark").text
-            grade = record.find("grade_value").text
-            gpa = f"{float(record.find('gpa').text):.2f}"
+            mark = record.mark
+            grade = record.grade_value
+            gpa = f"{record.gpa:.2f}"
 
             print(f"{subject_code:<10}{subject_name:<45}{credit:<15}{grading:<14}{mark:<8}{grade:<8}{gpa:<8}")
 
@@ -333,9 +393,9 @@ def grading_menu():
         print("\n======================================================")
         print("                    Grading Module                    ")
         print("======================================================")
-        print("1. Add Marks\n2. Edit Marks\n3. Display All Marks\n4. Search Marks\n5. Grading Dashboard\n6. Export Student Result Slip\n7. Back to Home Page")
+        print("1. Add Marks\n2. Edit Marks\n3. Display All Marks\n4. Search Marks\n5. Grading Dashboard\n6. Export Student Result Slip\n7. Export Result Slips for All Students\n8. Recompute All CGPA\n9. Verify CGPA\n10. Cohort Analytics\n11. Programme Average Marks (RDF)\n12. SPARQL Query Statistics\n13. Back to Home Page")
         
-        option = str(input("Select an option on the menu [1-7] : "))
+        option = str(input("Select an option on the menu [1-13] : "))
         
         # Add marks
         if option == '1':
@@ -390,8 +450,70 @@ def grading_menu():
             print("Press any key to back to grading menu...")
             getchar = input()
             clear_screen()
-        # Back to home page
+        # Batch result slips
         elif option == '7':
+            clear_screen()
+            print("\nGenerate Result Slips")
+            print("=" * 60)
+            programmes = sorted({s.programme for s in get_students()})
+            for idx, prog in enumerate(programmes, start=1):
+                print(f"{idx}. {prog}")
+            choice = input("Select programme (leave blank for all): ").strip()
+            programme = programmes[int(choice) - 1] if choice.isdigit() and 1 <= int(choice) <= len(programmes) else None
+            id_from = input("From Student ID (leave blank for first): ").strip() or None
+            id_to = input("To Student ID (leave blank for last): ").strip() or None
+            generate_result_slips(programme, id_from, id_to)
+            print("Press any key to back to grading menu...")
+            getchar = input()
+            clear_screen()
+        # Recompute every student's CGPA
+        elif option == '8':
+            clear_screen()
+            recompute_all_cgpa()
+            print("Press any key to back to grading menu...")
+            getchar = input()
+            clear_screen()
+        # Check the running CGPA totals against a full recompute
+        elif option == '9':
+            clear_screen()
+            sid = input("Enter Student ID to verify (leave blank for all): ").strip()
+            if verify_cgpa(sid or None):
+                print("Use 'Recompute All CGPA' to correct them.")
+            print("Press any key to back to grading menu...")
+            getchar = input()
+            clear_screen()
+        # Cohort analytics
+        elif option == '10':
+            clear_screen()
+            print("=" * 60)
+            print("Cohort Analytics")
+            print("=" * 60)
+            show_group_stats("programme")
+            show_group_stats("subject")
+            code = input("\nSubject code for the mark distribution (leave blank for all): ").strip().upper()
+            show_mark_distribution(code or None)
+            print("Press any key to back to grading menu...")
+            getchar = input()
+            clear_screen()
+        # Average mark per programme, one SPARQL query over the RDF graphs
+        elif option == '11':
+            clear_screen()
+            show_programme_average_marks()
+            print("Press any key to back to grading menu...")
+            getchar = input()
+            clear_screen()
+        # How often each SPARQL query ran in this session and how long it took
+        elif option == '12':
+            clear_screen()
+            print("=" * 69)
+            print("SPARQL Query Statistics (this session)")
+            print("=" * 69)
+            show_query_stats()
+            print("Press any key to back to grading menu...")
+            getchar = input()
+            clear_screen()
+        # Back to home page
+        elif option == '13':
             break
         # Invalid option
         else:
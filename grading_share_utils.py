@@ -1,161 +1,162 @@
 # for functions needed by both grading_module.py and rdf_utils.py
 
-import xml.etree.ElementTree as ET
 import os
+import sys
+import time
 
-from student_module import *
-from subject_module import *
-from rdf_utils import *
+from data_store import *
+from prereq_graph import *
 
 # This function is used to clear the screen
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
-STUDENT_FILE = "data/students.xml"
-SUBJECT_FILE = "data/subjects.xml"
-GRADE_FILE = "data/grades.xml"
+# Grading scale for grading type 'G': (lowest mark, grade, gpa), highest band first
+GRADE_SCALE = [
+    (90, 'A+', 4.00),
+    (80, 'A', 4.00),
+    (79, 'A-', 3.93),
+    (78, 'A-', 3.87),
+    (77, 'A-', 3.80),
+    (76, 'A-', 3.73),
+    (75, 'A-', 3.67),
+    (74, 'B+', 3.60),
+    (73, 'B+', 3.53),
+    (72, 'B+', 3.47),
+    (71, 'B+', 3.40),
+    (70, 'B+', 3.33),
+    (69, 'B', 3.27),
+    (68, 'B', 3.20),
+    (67, 'B', 3.13),
+    (66, 'B', 3.07),
+    (65, 'B', 3.00),
+    (64, 'B-', 2.93),
+    (63, 'B-', 2.87),
+    (62, 'B-', 2.80),
+    (61, 'B-', 2.73),
+    (60, 'B-', 2.67),
+    (59, 'C+', 2.59),
+    (58, 'C+', 2.53),
+    (57, 'C+', 2.46),
+    (56, 'C+', 2.40),
+    (55, 'C+', 2.33),
+    (54, 'C', 2.26),
+    (53, 'C', 2.20),
+    (52, 'C', 2.13),
+    (51, 'C', 2.07),
+    (50, 'C', 2.00),
+    (47, 'C-', 1.67),
+    (44, 'D+', 1.33),
+    (40, 'D', 1.00),
+    (0, 'F', 0.00),
+]
+
+# Grading scale for pass/fail subjects (any grading type other than 'G')
+PASS_FAIL_SCALE = [
+    (40, 'PASS', 4.00),
+    (0, 'FAIL', 0.00),
+]
+
+def _build_grade_table(scale):
+    # (grade, gpa) for every mark 0-100, so a lookup is a single list index
+    table = []
+    for mark in range(101):
+        for lowest, grade, gpa in scale:
+            if mark >= lowest:
+                table.append((grade, gpa))
+                break
+    return table
+
+GRADE_TABLE = _build_grade_table(GRADE_SCALE)
+PASS_FAIL_TABLE = _build_grade_table(PASS_FAIL_SCALE)
 
 def calculate_grade(mark, grading_type):
     mark = int(mark)
 
     if grading_type == 'G':
-        if 90 <= mark <= 100:
-            return 'A+', 4.00
-        elif 80 <= mark < 90:
-            return 'A', 4.00
-        elif 79 <= mark < 80:
-            return 'A-', 3.93
-        elif 78 <= mark < 79:
-            return 'A-', 3.87
-        elif 77 <= mark < 78:
-            return 'A-', 3.80
-        elif 76 <= mark < 77:
-            return 'A-', 3.73
-        elif 75 <= mark < 76:
-            return 'A-', 3.67
-        elif 74 <= mark < 75:
-            return 'B+', 3.60
-        elif 73 <= mark < 74:
-            return 'B+', 3.53
-        elif 72 <= mark < 73:
-            return 'B+', 3.47
-        elif 71 <= mark < 72:
-            return 'B+', 3.40
-        elif 70 <= mark < 71:
-            return 'B+', 3.33
-        elif 69 <= mark < 70:
-            return 'B', 3.27
-        elif 68 <= mark < 69:
-            return 'B', 3.20
-        elif 67 <= mark < 68:
-            return 'B', 3.13
-        elif 66 <= mark < 67:
-            return 'B', 3.07
-        elif 65 <= mark < 66:
-            return 'B', 3.00
-        elif 64 <= mark < 65:
-            return 'B-', 2.93
-        elif 63 <= mark < 64:
-            return 'B-', 2.87
-        elif 62 <= mark < 63:
-            return 'B-', 2.80
-        elif 61 <= mark < 62:
-            return 'B-', 2.73
-        elif 60 <= mark < 61:
-            return 'B-', 2.67
-        elif 59 <= mark < 60:
-            return 'C+', 2.59
-        elif 58 <= mark < 59:
-            return 'C+', 2.53
-        elif 57 <= mark < 58:
-            return 'C+', 2.46
-        elif 56 <= mark < 57:
-            return 'C+', 2.40
-        elif 55 <= mark < 56:
-            return 'C+', 2.33
-        elif 54 <= mark < 55:
-            return 'C', 2.26
-        elif 53 <= mark < 54:
-            return 'C', 2.20
-        elif 52 <= mark < 53:
-            return 'C', 2.13
-        elif 51 <= mark < 52:
-            return 'C', 2.07
-        elif 50 <= mark < 51:
-            return 'C', 2.00
-        elif 47 <= mark < 50:
-            return 'C-', 1.67
-        elif 44 <= mark < 47:
-            return 'D+', 1.33
-        elif 40 <= mark < 44:
-            return 'D', 1.00
-        elif 0 <= mark < 40:
-            return 'F', 0.00
-        else:
-            return 'Invalid', 0.00
+        if 0 <= mark <= 100:
+            return GRADE_TABLE[mark]
+        return 'Invalid', 0.00
     else:
-        if mark >= 40:
-            return 'PASS', 4.00
-        else:
-            return 'FAIL', 0.00
+        if 0 <= mark <= 100:
+            return PASS_FAIL_TABLE[mark]
+        # marks outside 0-100 still pass from 40 upwards
+        return ('PASS', 4.00) if mark >= 40 else ('FAIL', 0.00)
+
+def calculate_grades(marks, grading_type):
+    """Grade many marks of one grading type in a single call.
+
+    Returns (grades, gpas). A NumPy array of marks gives two NumPy arrays
+    back, any other sequence gives two lists. Results are the same as
+    calling calculate_grade() on each mark.
+    """
+    # NumPy is optional; a NumPy array can only come from a caller that has
+    # already imported it
+    np = sys.modules.get("numpy")
+    if np is not None and isinstance(marks, np.ndarray):
+        return _calculate_grades_array(marks, grading_type)
+
+    pairs = [calculate_grade(mark, grading_type) for mark in marks]
+    return [grade for grade, _ in pairs], [gpa for _, gpa in pairs]
+
+def _calculate_grades_array(marks, grading_type):
+    import numpy as np
+
+    table = GRADE_TABLE if grading_type == 'G' else PASS_FAIL_TABLE
+    table_grades = np.array([grade for grade, _ in table], dtype=object)
+    table_gpas = np.array([gpa for _, gpa in table], dtype=float)
+
+    marks = marks.astype(int)
+    in_range = (marks >= 0) & (marks <= 100)
+    idx = np.clip(marks, 0, 100)
+    grades = table_grades[idx]
+    gpas = table_gpas[idx]
+
+    if grading_type == 'G':
+        grades[~in_range] = 'Invalid'
+        gpas[~in_range] = 0.00
+    else:
+        grades[marks > 100] = 'PASS'
+        gpas[marks > 100] = 4.00
+    return grades, gpas
 
 def update_cgpa(student_id):
-    grade_tree = ET.parse(GRADE_FILE)
-    subject_tree = ET.parse(SUBJECT_FILE)
-    student_tree = ET.parse(STUDENT_FILE)
-
-    grades = [
-        g for g in grade_tree.getroot().findall("grade")
-        if g.get("student_id") == student_id
-    ]
-
-    total_points = 0.0
-    total_credits = 0     # for CGPA (only grading type = 'G')
-    all_credits = 0       # total taken credit hours (includes P and G)
-
-    for grade in grades:
-        subject_code = grade.get("subject_code")
-        gpa = float(grade.find("gpa").text)
-
-        # Get subject's credit hour and grading type
-        subject = next((s for s in subject_tree.getroot().findall("subject") if s.get("code") == subject_code), None)
-        if subject is None:
-            continue
-
-        credit_hour = int(subject.find("credit").text)
-        grading_type = subject.find("grading").text
-
-        all_credits += credit_hour  # count for both G and P
-
-        if grading_type == 'G':
-            total_points += gpa * credit_hour
-            total_credits += credit_hour
-
-    new_cgpa = total_points / total_credits if total_credits > 0 else 0.0
-
-    # Update student info
-    for stu in student_tree.getroot().findall("student"):
-        if stu.get("id") == student_id:
-            stu.find("cgpa").text = f"{new_cgpa:.2f}"
-            stu.find("taken_CH").text = str(all_credits)
-            
-            # Update or create cgpa_CH element
-            cgpa_ch_elem = stu.find("cgpa_CH")
-            if cgpa_ch_elem is None:
-                cgpa_ch_elem = ET.SubElement(stu, "cgpa_CH")
-            cgpa_ch_elem.text = str(total_credits)
-            break
-
-    student_tree.write(STUDENT_FILE)
+    # The store keeps running CGPA totals per student and applies every grade
+    # change to them as it happens, so this only copies those totals into the
+    # student's record.
+    get_store().update_cgpa(student_id)
+
+def recompute_all_cgpa():
+    """Recompute the CGPA of every student in one batch, e.g. after a
+    subject's credit hours were corrected. Returns the number of student
+    records that changed."""
+    start = time.perf_counter()
+    changed = get_store().recompute_all_cgpa()
+    elapsed = time.perf_counter() - start
+    total = len(get_store().list_students())
+    print(f"Recomputed CGPA for {total} student(s) in {elapsed:.3f}s, {changed} record(s) changed.")
+    return changed
+
+def verify_cgpa(student_id=None):
+    """Check the running CGPA totals against a full recompute.
+
+    Checks one student, or every student when student_id is None, and
+    returns the list of mismatches (empty when everything agrees).
+    """
+    mismatches = get_store().verify_cgpa(student_id)
+    if not mismatches:
+        print("CGPA verified: running totals match a full recompute.")
+        return mismatches
+
+    print(f"CGPA mismatch for {len(mismatches)} student(s):")
+    print(f"{'ID':<10}{'Expected CGPA':<15}{'Expected CH':<13}{'Running CGPA':<15}{'Running CH':<13}")
+    for sid, want, have in mismatches:
+        print(f"{sid:<10}{want.cgpa:<15.2f}{want.taken_ch:<13}{have.cgpa:<15.2f}{have.taken_ch:<13}")
+    return mismatches
 
 def has_passed(student_id, subject_code):
     """Return True if the student passed the given subject_code."""
-    grade_tree = ET.parse(GRADE_FILE)
-    for g in grade_tree.getroot().findall("grade"):
-        if g.get("student_id") == student_id and g.get("subject_code") == subject_code:
-            grade = g.find("grade_value").text.upper()
-            return grade != "F"
-    return False
+    return get_prerequisite_graph().has_passed(student_id, subject_code)
 
 # If this file is executed, redirect to main.py
 if __name__ == "__main__":
@@ -0,0 +1,111 @@
+# Throughput of the data store under several operators writing at once.
+#
+# Each simulated operator is a separate process with its own DataStore over
+# a scratch copy of the data folder, recording marks as fast as it can (one
+# transaction per mark, as the grading menu does). Commits are serialised by
+# the store's write lock, and a commit that finds the files changed by
+# another operator is re-applied on the newer data. At the end every mark
+# written must be in the grade file and every CGPA must match its grades.
+#
+# Usage: python operator_sim.py [operators ...] [--marks N]
+#   e.g. python operator_sim.py 1 2 4 8 --marks 100
+
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from data_store import *
+from grading_share_utils import *
+
+STUDENTS_PER_OPERATOR = 20
+
+
+def _files(data_dir):
+    return (os.path.join(data_dir, "students.xml"), os.path.join(data_dir, "subjects.xml"),
+            os.path.join(data_dir, "grades.xml"))
+
+def _student_id(operator, n):
+    return f"OP{operator:02}-{n:02}"
+
+def _mark_plan(operator, marks, subject_codes):
+    # [(student ID, subject code, mark)] in the order the operator enters them
+    plan = []
+    for i in range(marks):
+        student_id = _student_id(operator, i % STUDENTS_PER_OPERATOR)
+        code = subject_codes[(i // STUDENTS_PER_OPERATOR) % len(subject_codes)]
+        plan.append((student_id, code, (operator * 7 + i * 13) % 101))
+    return plan
+
+def _grade(store, student_id, code, mark):
+    grade_value, gpa = calculate_grade(mark, store.get_subject(code).grading)
+    return Grade(student_id, code, mark, grade_value, gpa)
+
+def _operator(data_dir, plan, start_at):
+    store = DataStore(*_files(data_dir))
+    store.get_cgpa_totals(None)  # load before the clock starts, as a logged-in terminal would have
+    time.sleep(max(start_at - time.time(), 0))
+    for student_id, code, mark in plan:
+        store.add_grade(_grade(store, student_id, code, mark))
+    finished = time.time()
+    store.close()
+    return finished, store.conflicts
+
+def _prepare(data_dir, operators):
+    for path, source in zip(_files(data_dir), (STUDENT_FILE, SUBJECT_FILE, GRADE_FILE)):
+        shutil.copy(source, path)
+    store = DataStore(*_files(data_dir))
+    with store.transaction():
+        for operator in range(operators):
+            for n in range(STUDENTS_PER_OPERATOR):
+                student_id = _student_id(operator, n)
+                store.add_student(Student(student_id, f"Operator {operator} Student {n}",
+                                          "Degree in Computer Science (AI)", f"{student_id}@sim.local"))
+    store.close()
+    return sorted(s.code for s in store.list_subjects())
+
+def simulate_operators(operators, marks=50):
+    """Run operators concurrent processes entering marks each and return
+    (elapsed seconds, marks per second, conflicts retried, problems), where
+    problems lists any lost update or CGPA mismatch found afterwards."""
+    data_dir = tempfile.mkdtemp(prefix="operator_sim_")
+    try:
+        subject_codes = _prepare(data_dir, operators)
+        plans = [_mark_plan(operator, marks, subject_codes) for operator in range(operators)]
+        start_at = time.time() + 0.5 + 0.1 * operators
+        with ProcessPoolExecutor(max_workers=operators) as executor:
+            results = list(executor.map(_operator, [data_dir] * operators, plans, [start_at] * operators))
+        elapsed = max(finished for finished, conflicts in results) - start_at
+        conflicts = sum(conflicts for finished, conflicts in results)
+
+        store = DataStore(*_files(data_dir))
+        problems = []
+        for plan in plans:
+            expected = {(student_id, code): mark for student_id, code, mark in plan}
+            for (student_id, code), mark in expected.items():
+                grade = store.get_grade(student_id, code)
+                if grade is None or grade.mark != mark:
+                    problems.append(f"lost update {student_id} {code}")
+        problems += [f"CGPA mismatch {sid}" for sid, want, have in store.verify_cgpa()]
+        return elapsed, operators * marks / elapsed, conflicts, problems
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure data store throughput under concurrent operators.")
+    parser.add_argument("operators", nargs="*", type=int, default=[1, 2, 4, 8])
+    parser.add_argument("--marks", type=int, default=50, help="marks entered by each operator")
+    args = parser.parse_args()
+
+    print(f"{'Operators':<11}{'Marks':<8}{'Seconds':<10}{'Marks/s':<10}{'Retried':<10}Result")
+    print("-" * 60)
+    for operators in args.operators:
+        elapsed, rate, conflicts, problems = simulate_operators(operators, args.marks)
+        result = "OK" if not problems else f"{len(problems)} problems: {problems[0]}"
+        print(f"{operators:<11}{operators * args.marks:<8}{elapsed:<10.2f}{rate:<10.1f}{conflicts:<10}{result}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+# Prerequisite graph over the subjects.
+#
+# A subject's <prerequisite> is empty, a single subject code, or codes
+# combined with AND / OR (also written & , and |) and brackets, e.g.
+#   TCP6114 AND (TDB6113 OR TDC6123)
+# AND binds tighter than OR.
+#
+# Every subject code gets a fixed bit position and every prerequisite is
+# compiled to a list of bit masks, one per alternative: a set of subjects
+# that must all be passed. For each student the graph keeps an int bitset
+# of the subjects passed, updated from store change events, so whether a
+# student may take a subject is `mask & passed == mask` for one of its
+# (usually one) masks, with no grade lookups. The events of a transaction
+# only arrive when it commits, so while one is open a student's bitset is
+# made from their grades in the store instead.
+#
+# The graph also keeps the subjects in topological order (prerequisites
+# first), the transitive closure of every subject's prerequisites as a
+# bitset, and the subjects that sit on a prerequisite cycle; those can never
+# be taken, and new cycles are refused when a prerequisite is entered.
+
+import heapq
+import re
+
+from data_store import *
+
+# limit on the alternatives one expression may expand to, e.g. (A OR B) AND
+# (C OR D) is 4 alternatives
+MAX_ALTERNATIVES = 256
+
+_TOKEN = re.compile(r"\(|\)|&|\||,|[^\s()&|,]+")
+
+
+class PrerequisiteError(ValueError):
+    """A prerequisite expression that cannot be parsed."""
+
+
+def grade_passed(grade):
+    return grade.grade_value.upper() not in ("F", "FAIL")
+
+
+def offered_to(subject, programme):
+    """True if students of programme may take subject."""
+    return (subject.programme or "For All Programmes") in (programme, "For All Programmes", "All")
+
+
+def parse_prerequisite(text):
+    """Return a prerequisite expression as its alternatives: a list of sets
+    of subject codes, any one of which must be passed in full. An empty
+    expression gives [set()], i.e. nothing is required."""
+    tokens = []
+    for token in _TOKEN.findall(text or ""):
+        upper = token.upper()
+        tokens.append("&" if upper in ("AND", ",") else "|" if upper == "OR" else token)
+    if not tokens:
+        return [set()]
+    pos = 0
+
+    def peek():
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take():
+        nonlocal pos
+        token = peek()
+        if token is None:
+            raise PrerequisiteError("Prerequisite ends too early.")
+        pos += 1
+        return token
+
+    def either():
+        alternatives = both()
+        while peek() == "|":
+            take()
+            alternatives = alternatives + both()
+        return alternatives
+
+    def both():
+        alternatives = single()
+        while peek() == "&":
+            take()
+            right = single()
+            alternatives = [a | b for a in alternatives for b in right]
+            if len(alternatives) > MAX_ALTERNATIVES:
+                raise PrerequisiteError("Prerequisite has too many combinations.")
+        return alternatives
+
+    def single():
+        token = take()
+        if token == "(":
+            alternatives = either()
+            if take() != ")":
+                raise PrerequisiteError("Missing closing bracket in prerequisite.")
+            return alternatives
+        if token in (")", "&", "|"):
+            raise PrerequisiteError(f"Unexpected '{token}' in prerequisite.")
+        return [{token}]
+
+    alternatives = either()
+    if peek() is not None:
+        raise PrerequisiteError(f"Unexpected '{peek()}' in prerequisite.")
+    # drop repeated alternatives and any that include another one
+    unique = []
+    for alternative in sorted(alternatives, key=len):
+        if not any(other <= alternative for other in unique):
+            unique.append(alternative)
+    return unique
+
+
+def _bits(mask):
+    # bit positions set in mask
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+class PrerequisiteGraph:
+    def __init__(self, store):
+        self.store = store
+        self.codes = []  # bit position -> subject code; positions are never reused
+        self._bit = {}   # subject code -> bit position
+        self._passed = None  # student ID -> bitset, built on first use
+        self._build()
+
+    def _position(self, code):
+        bit = self._bit.get(code)
+        if bit is None:
+            bit = self._bit[code] = len(self.codes)
+            self.codes.append(code)
+        return bit
+
+    def _mask(self, codes):
+        mask = 0
+        for code in codes:
+            mask |= 1 << self._position(code)
+        return mask
+
+    def _build(self):
+        self.requires = {}   # subject code -> [mask]; [0] if nothing is required
+        self.invalid = []    # subjects whose prerequisite could not be parsed
+        depends = {}         # subject code -> codes named in its prerequisite
+        for subject in self.store.list_subjects():
+            self._position(subject.code)
+            try:
+                alternatives = parse_prerequisite(subject.prerequisite)
+            except PrerequisiteError:
+                alternatives = []
+                self.invalid.append(subject.code)
+            self.requires[subject.code] = [self._mask(a) for a in alternatives]
+            depends[subject.code] = set().union(*alternatives)
+        self._order(depends)
+
+    def _order(self, depends):
+        # Kahn's algorithm over the subjects that exist
+        dependents = {code: [] for code in depends}
+        waiting = {}
+        for code, needed in depends.items():
+            needed = [d for d in needed if d in depends]
+            waiting[code] = len(needed)
+            for d in needed:
+                dependents[d].append(code)
+        ready = [code for code, n in waiting.items() if n == 0]
+        heapq.heapify(ready)  # ties are taken in code order
+        self.order = []
+        while ready:
+            code = heapq.heappop(ready)
+            self.order.append(code)
+            for dependent in dependents[code]:
+                waiting[dependent] -= 1
+                if waiting[dependent] == 0:
+                    heapq.heappush(ready, dependent)
+
+        # closure[code]: every subject required directly or indirectly
+        self.closure = {}
+        for code in self.order:
+            mask = 0
+            for d in depends[code]:
+                mask |= (1 << self._bit[d]) | self.closure.get(d, 0)
+            self.closure[code] = mask
+        # subjects left over are on a cycle or depend on one
+        for code in depends:
+            if code not in self.closure:
+                self.closure[code] = self._reach(code, depends)
+        self.cyclic = sorted(code for code in depends
+                             if self.closure[code] >> self._bit[code] & 1)
+        for code in self.cyclic:
+            self.requires[code] = []  # can never be met
+        # most subjects have a single alternative; keep those apart so
+        # eligible() is one mask test per subject for them
+        self._single = [(1 << self._bit[code], masks[0]) for code, masks in self.requires.items() if len(masks) == 1]
+        self._multiple = [(1 << self._bit[code], masks) for code, masks in self.requires.items() if len(masks) > 1]
+
+    def _reach(self, code, depends):
+        mask = 0
+        stack = [code]
+        while stack:
+            for d in depends.get(stack.pop(), ()):
+                bit = 1 << self._bit[d]
+                if not mask & bit:
+                    mask |= bit
+                    stack.append(d)
+        return mask
+
+    # ---------- keeping in sync ----------
+
+    def _build_passed(self):
+        self._passed = {}
+        for grade in self.store.list_grades():
+            if grade_passed(grade):
+                sid = grade.student_id
+                self._passed[sid] = self._passed.get(sid, 0) | 1 << self._position(grade.subject_code)
+
+    def on_change(self, kind, key, record):
+        if kind == "subject":
+            self._build()
+        elif kind == "grade" and self._passed is not None:
+            if key is None:
+                self._passed = None
+                return
+            sid, code = key
+            bit = 1 << self._position(code)
+            passed = self._passed.get(sid, 0)
+            if record is not None and grade_passed(record):
+                self._passed[sid] = passed | bit
+            else:
+                self._passed[sid] = passed & ~bit
+
+    # ---------- queries ----------
+
+    def passed(self, student_id):
+        """Bitset of the subjects the student has passed."""
+        if self.store.in_transaction():
+            # e.g. a prerequisite passed earlier in the same Add Marks session
+            return self._mask(g.subject_code for g in self.store.grades_for_student(student_id) if grade_passed(g))
+        self.ensure_passed()
+        return self._passed.get(student_id, 0)
+
+    def ensure_passed(self):
+        """Build every student's passed bitset now, if that is not done yet
+        (otherwise the first passed() call does it)."""
+        if self._passed is None:
+            self._build_passed()
+
+    def has_passed(self, student_id, code):
+        bit = self._bit.get(code)
+        return bit is not None and bool(self.passed(student_id) >> bit & 1)
+
+    def is_eligible(self, code, passed):
+        """True if a student with the passed bitset meets the prerequisite of code."""
+        return any(mask & passed == mask for mask in self.requires.get(code, ()))
+
+    def eligible_mask(self, passed):
+        """Bitset of the subjects whose prerequisites are met by the passed bitset."""
+        eligible = 0
+        for bit, mask in self._single:
+            if mask & passed == mask:
+                eligible |= bit
+        for bit, masks in self._multiple:
+            for mask in masks:
+                if mask & passed == mask:
+                    eligible |= bit
+                    break
+        return eligible
+
+    def eligible(self, student_id):
+        """Set of subject codes whose prerequisites the student has met."""
+        return set(self.codes_of(self.eligible_mask(self.passed(student_id))))
+
+    def mask_of(self, codes):
+        """Bitset of subject codes."""
+        return self._mask(codes)
+
+    def codes_of(self, mask):
+        """Subject codes in a bitset."""
+        return [self.codes[bit] for bit in _bits(mask)]
+
+    def prerequisites_of(self, code):
+        """Every subject code needed before code, directly or indirectly."""
+        return self.codes_of(self.closure.get(code, 0))
+
+
+_prerequisite_graph = None
+
+def get_prerequisite_graph():
+    """Return the process-wide PrerequisiteGraph, building it on first use."""
+    global _prerequisite_graph
+    if _prerequisite_graph is None:
+        store = get_store()
+        _prerequisite_graph = PrerequisiteGraph(store)
+        store.add_listener(_prerequisite_graph.on_change)
+    return _prerequisite_graph
+
+def prerequisite_error(code, text):
+    """Return why text cannot be the prerequisite of subject code, or None
+    if it can."""
+    try:
+        alternatives = parse_prerequisite(text)
+    except PrerequisiteError as e:
+        return str(e)
+    needed = set().union(*alternatives)
+    if code in needed:
+        return "A subject cannot be its own prerequisite."
+    store = get_store()
+    unknown = sorted(c for c in needed if store.get_subject(c) is None)
+    if unknown:
+        return "Unknown subject code: " + ", ".join(unknown)
+    graph = get_prerequisite_graph()
+    for c in sorted(needed):
+        if code in graph.prerequisites_of(c):
+            return f"{c} already requires {code}, so this would make a prerequisite cycle."
+    return None
+
+# If this file is executed, redirect to main.py
+if __name__ == "__main__":
+    import main
+    main.main()
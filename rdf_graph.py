@@ -0,0 +1,338 @@
+# RDF graphs of the student, subject and grade records.
+#
+# Only imported when an RDF graph is first needed (see rdf_utils.py), so
+# rdflib is not loaded by programs that never touch one. rdf_utils passes
+# on the data store's change events once this module is loaded.
+
+from rdflib import Dataset, Namespace, Literal, RDF, URIRef, XSD
+from rdflib.plugin import PluginException
+import os
+import atexit
+import threading
+
+from data_store import *
+from prereq_graph import *
+from sparql_utils import *
+
+EX = Namespace("http://example.org/")
+GRAPH = Namespace("http://example.org/graph/")
+
+# RDF dataset
+#
+# Students, subjects, grades and the inferred triples (below) are the named
+# graphs <graph/student>, <graph/subject>, <graph/grade> and <graph/inferred>
+# of one rdflib Dataset, with every class and property in the ex: namespace:
+#   <student/S001>        a ex:Student ; ex:name ; ex:programme ; ex:email ; ex:cgpa
+#   <subject/TCP6114>     a ex:Subject ; ex:code ; ex:name ; ex:credit ; ex:programme ; ex:prerequisite
+#   <grade/S001_TCP6114>  a ex:Grade ; ex:student <student/S001> ; ex:subject <subject/TCP6114> ;
+#                         ex:mark ; ex:gradeValue ; ex:gpa
+# Numbers are typed literals, so SPARQL can aggregate them, and a grade links
+# to its student and subject by URI, so a join across the graphs is a single
+# query on the dataset (its default graph is the union of the named graphs).
+#
+# Each named graph is built from the data store on first use and then kept
+# in sync with it: every student, subject or grade change removes that
+# entity's triples and adds the new ones. Graphs are written to data/*.rdf in
+# the background RDF_SAVE_DELAY seconds after the last change (and at exit),
+# never on a read path.
+#
+# The dataset is kept in memory unless a persistent rdflib store is
+# installed: RDF_STORE "auto" uses Oxigraph (the oxrdflib package) or else
+# BerkeleyDB (the berkeleydb package), in RDF_STORE_PATH. A persistent store
+# also records the data store version each graph was saved at, and a graph
+# is only rebuilt at start-up if the records have changed since.
+
+RDF_FILES = {
+    "student": "data/students.rdf",
+    "subject": "data/subjects.rdf",
+    "grade": "data/grades.rdf",
+    "inferred": "data/inferred.rdf",
+}
+RDF_SAVE_DELAY = 2.0
+RDF_STORE = os.environ.get("RDF_STORE", "auto")
+RDF_STORE_PATH = "data/rdfstore"
+
+_dataset = None
+_persistent = False     # the dataset outlives the process
+_graphs = {}            # "student" / "subject" / "grade" / "inferred" -> named graph, once built
+_dirty_graphs = set()   # graphs changed since they were last saved
+_graph_versions = {}    # kind -> data store version the graph reflects
+_graph_lock = threading.RLock()
+_save_timer = None
+
+def _open_dataset():
+    names = ["Oxigraph", "BerkeleyDB"] if RDF_STORE == "auto" else [RDF_STORE]
+    for name in names:
+        if name == "Memory":
+            break
+        try:
+            dataset = Dataset(store=name, default_union=True)
+            os.makedirs(RDF_STORE_PATH, exist_ok=True)
+            dataset.open(RDF_STORE_PATH, create=True)
+            return dataset, True
+        except (PluginException, ImportError):
+            continue  # not installed
+    return Dataset(default_union=True), False
+
+def get_dataset():
+    """Return the RDF dataset holding the named graphs, opening it on first use."""
+    global _dataset, _persistent
+    with _graph_lock:
+        if _dataset is None:
+            _dataset, _persistent = _open_dataset()
+            _dataset.bind("ex", EX)
+            _dataset.bind("graph", GRAPH)
+        return _dataset
+
+def _close_dataset():
+    if _persistent:
+        _dataset.close()
+
+def student_uri(student_id):
+    return URIRef(f"http://example.org/student/{student_id}")
+
+def subject_uri(code):
+    return URIRef(f"http://example.org/subject/{code}")
+
+def grade_uri(student_id, subject_code):
+    return URIRef(f"http://example.org/grade/{student_id}_{subject_code}")
+
+def _add_student_triples(g, s):
+    sid = student_uri(s.id)
+    g.add((sid, RDF.type, EX.Student))
+    g.add((sid, EX.name, Literal(s.name)))
+    g.add((sid, EX.programme, Literal(s.programme)))
+    g.add((sid, EX.email, Literal(s.email)))
+    g.add((sid, EX.cgpa, Literal(f"{s.cgpa:.2f}", datatype=XSD.decimal)))
+
+def _add_subject_triples(g, subj):
+    subj_uri = subject_uri(subj.code)
+    g.add((subj_uri, RDF.type, EX.Subject))
+    g.add((subj_uri, EX.code, Literal(subj.code)))
+    g.add((subj_uri, EX.name, Literal(subj.name)))
+    g.add((subj_uri, EX.credit, Literal(subj.credit)))
+    g.add((subj_uri, EX.programme, Literal(subj.programme or "For All Programmes")))
+    if subj.prerequisite:
+        g.add((subj_uri, EX.prerequisite, Literal(subj.prerequisite)))
+
+def _add_grade_triples(g, grade):
+    uri = grade_uri(grade.student_id, grade.subject_code)
+    g.add((uri, RDF.type, EX.Grade))
+    g.add((uri, EX.student, student_uri(grade.student_id)))
+    g.add((uri, EX.subject, subject_uri(grade.subject_code)))
+    g.add((uri, EX.mark, Literal(grade.mark)))
+    g.add((uri, EX.gradeValue, Literal(grade.grade_value)))
+    g.add((uri, EX.gpa, Literal(f"{grade.gpa:.2f}", datatype=XSD.decimal)))
+
+def _data_version(kind):
+    # the data store version a graph of kind is built from
+    store = get_store()
+    if kind == "inferred":
+        return tuple(store.data_version(k) for k in ("student", "subject", "grade"))
+    return store.data_version(kind)
+
+def _build_graph(kind):
+    # (re)fill the named graph of kind from the data store
+    store = get_store()
+    g = get_dataset().graph(GRAPH[kind])
+    if kind == "student":
+        records = store.list_students()
+    elif kind == "subject":
+        records = store.list_subjects()
+    elif kind == "grade":
+        records = store.list_grades()
+    else:
+        records = None  # derived from all three
+        store.list_students()
+        store.list_subjects()
+        store.list_grades()
+    version = _data_version(kind)
+    if _persistent and _dataset.value(GRAPH[kind], EX.dataVersion) == Literal(repr(version)):
+        pass  # saved from the same records
+    else:
+        g.remove((None, None, None))
+        if kind == "student":
+            for s in records:
+                _add_student_triples(g, s)
+        elif kind == "subject":
+            for subj in records:
+                _add_subject_triples(g, subj)
+        elif kind == "grade":
+            for grade in records:
+                _add_grade_triples(g, grade)
+        else:
+            _build_inferred(g)
+        _dirty_graphs.add(kind)
+    _graph_versions[kind] = version
+    return g
+
+def get_graph(kind):
+    with _graph_lock:
+        if kind not in _graphs:
+            _graphs[kind] = _build_graph(kind)
+        return _graphs[kind]
+
+def on_store_change(kind, key, record):
+    # keeps the student, subject and grade graphs in sync; the inferred
+    # graph has its own listener below
+    with _graph_lock:
+        if key is None or kind not in _graphs:
+            # reloaded from disk or not built yet: build it here so the
+            # background save never has to read the data store
+            _graphs[kind] = _build_graph(kind)
+        else:
+            g = _graphs[kind]
+            if kind == "student":
+                g.remove((student_uri(key), None, None))
+                if record is not None:
+                    _add_student_triples(g, record)
+            elif kind == "subject":
+                g.remove((subject_uri(key), None, None))
+                if record is not None:
+                    _add_subject_triples(g, record)
+            else:
+                g.remove((grade_uri(*key), None, None))
+                if record is not None:
+                    _add_grade_triples(g, record)
+            _graph_versions[kind] = _data_version(kind)
+        _dirty_graphs.add(kind)
+    _schedule_save()
+
+def _schedule_save():
+    # debounce: restart the timer so a burst of changes is saved once
+    global _save_timer
+    with _graph_lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+        _save_timer = threading.Timer(RDF_SAVE_DELAY, save_graphs)
+        _save_timer.daemon = True
+        _save_timer.start()
+
+def save_graphs():
+    """Write every graph changed since the last save to its data/*.rdf file."""
+    with _graph_lock:
+        for kind in sorted(_dirty_graphs):
+            _graphs[kind].serialize(RDF_FILES[kind], "xml")
+            if _persistent:
+                _dataset.set((GRAPH[kind], EX.dataVersion, Literal(repr(_graph_versions[kind]))))
+        _dirty_graphs.clear()
+
+atexit.register(_close_dataset)
+atexit.register(save_graphs)  # runs first
+
+# Materialised inference
+#
+# The "inferred" graph holds triples derived by forward chaining from the
+# grade, student and subject data:
+#   student :enrolledIn subject   the student has a grade for the subject
+#   student :hasPassed subject    ... and passed it
+#   student :hasFailed subject    ... and failed it
+#   student :eligibleFor subject  the subject is offered to the student's
+#                                 programme, its prerequisites are met by
+#                                 :hasPassed (AND / OR as in prereq_graph.py)
+#                                 and the student has not passed it yet
+# It is built on first use and then maintained incrementally: a grade
+# change re-derives the facts of that one student and a subject change the
+# :eligibleFor triples of that subject, so eligibility is a triple lookup.
+
+_offered_masks = {}  # programme -> bitset of the subjects it offers
+
+def _add_grade_facts(g, grade):
+    sid = student_uri(grade.student_id)
+    subject = subject_uri(grade.subject_code)
+    g.add((sid, EX.enrolledIn, subject))
+    g.add((sid, EX.hasPassed if grade_passed(grade) else EX.hasFailed, subject))
+
+def _add_eligible(g, student):
+    prereqs = get_prerequisite_graph()
+    offered = _offered_masks.get(student.programme)
+    if offered is None:
+        offered = _offered_masks[student.programme] = prereqs.mask_of(
+            s.code for s in get_store().list_subjects() if offered_to(s, student.programme))
+    passed = prereqs.passed(student.id)
+    sid = student_uri(student.id)
+    for code in prereqs.codes_of(prereqs.eligible_mask(passed) & offered & ~passed):
+        g.add((sid, EX.eligibleFor, subject_uri(code)))
+
+def _build_inferred(g):
+    _offered_masks.clear()
+    store = get_store()
+    for grade in store.list_grades():
+        _add_grade_facts(g, grade)
+    for student in store.list_students():
+        _add_eligible(g, student)
+
+def _on_inferred_change(kind, key, record):
+    with _graph_lock:
+        g = _graphs["inferred"]
+        if key is None:
+            _graphs["inferred"] = _build_graph("inferred")
+        elif kind == "subject":
+            # only eligibility for this subject can change
+            _offered_masks.clear()
+            subject = subject_uri(key)
+            g.remove((None, EX.eligibleFor, subject))
+            if record is not None:
+                prereqs = get_prerequisite_graph()
+                for student in get_store().list_students():
+                    passed = prereqs.passed(student.id)
+                    if (offered_to(record, student.programme) and prereqs.is_eligible(key, passed)
+                            and not prereqs.has_passed(student.id, key)):
+                        g.add((student_uri(student.id), EX.eligibleFor, subject))
+        elif kind == "grade":
+            sid, subject = student_uri(key[0]), subject_uri(key[1])
+            for predicate in (EX.enrolledIn, EX.hasPassed, EX.hasFailed):
+                g.remove((sid, predicate, subject))
+            if record is not None:
+                _add_grade_facts(g, record)
+            g.remove((sid, EX.eligibleFor, None))
+            student = get_store().get_student(key[0])
+            if student is not None:
+                _add_eligible(g, student)
+        else:
+            g.remove((student_uri(key), EX.eligibleFor, None))
+            if record is not None:
+                _add_eligible(g, record)
+        _graph_versions["inferred"] = _data_version("inferred")
+        _dirty_graphs.add("inferred")
+    _schedule_save()
+
+def load_inferred_graph():
+    with _graph_lock:
+        if "inferred" not in _graphs:
+            # the prerequisite graph listens first, so its passed sets are
+            # up to date by the time _on_inferred_change runs
+            get_prerequisite_graph()
+            _graphs["inferred"] = _build_graph("inferred")
+            get_store().add_listener(_on_inferred_change)
+        return _graphs["inferred"]
+
+# SPARQL queries, prepared on their first run; user input is bound through
+# initBindings
+
+register_query("student_programme", """
+    PREFIX ex: <http://example.org/>
+
+    SELECT ?programme WHERE {
+        GRAPH <http://example.org/graph/student> { ?student ex:programme ?programme . }
+    }
+""")
+
+# grade -> student -> programme in one query; each pattern is a lookup on
+# the store's indexes
+register_query("programme_average_mark", """
+    PREFIX ex: <http://example.org/>
+
+    SELECT ?programme (COUNT(?grade) AS ?grades) (AVG(?mark) AS ?average) WHERE {
+        ?grade ex:student ?student ;
+               ex:mark ?mark .
+        ?student ex:programme ?programme .
+    }
+    GROUP BY ?programme
+    ORDER BY ?programme
+""")
+
+# If this file is executed, redirect to main.py
+if __name__ == "__main__":
+    import main
+    main.main()
@@ -1,87 +1,65 @@
-from rdflib import Graph, Namespace, Literal, RDF, URIRef
-import xml.etree.ElementTree as ET
 import os
+import sys
 
-from student_module import *
-from subject_module import *
-from grading_module import *
+from data_store import *
 from grading_share_utils import *
-
-STUDENT_FILE = "data/students.xml"
-SUBJECT_FILE = "data/subjects.xml"
-GRADE_FILE = "data/grades.xml"
+from prereq_graph import *
+from search_utils import *
+from sparql_utils import *
 
 # This function is used to clear the screen
 def clear_screen():
     os.system('cls' if os.name == 'nt' else 'clear')
 
-EX = Namespace("http://example.org/")
+# The RDF graphs are in rdf_graph.py, which is imported on first use so that
+# rdflib is only loaded by the parts of the program that need it.
 
-#student module
+def _rdf_graph():
+    import rdf_graph
+    return rdf_graph
+
+def _on_store_change(kind, key, record):
+    # The RDF files follow every change, so the first change loads the
+    # graphs; a reload before then has nothing to update.
+    if key is not None or "rdf_graph" in sys.modules:
+        _rdf_graph().on_store_change(kind, key, record)
 
-def load_students_to_graph(xml_file):
-    g = Graph()
-    EXs = Namespace("http://example.org/student/")
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
-    for s in root.findall("student"):
-        sid = URIRef(EXs[s.get("id")])
-        g.add((sid, RDF.type, EXs.Student))
-        g.add((sid, EXs.name, Literal(s.find("name").text)))
-        g.add((sid, EXs.programme, Literal(s.find("programme").text)))
-        g.add((sid, EXs.email, Literal(s.find("email").text)))
-        g.add((sid, EXs.cgpa, Literal(s.find("cgpa").text)))
+get_store().add_listener(_on_store_change)
 
-    # Save the graph to an RDF file
-    g.serialize("data/students.rdf", "xml")
 
-    return g
+#student module
+
+def load_students_to_graph():
+    return _rdf_graph().get_graph("student")
 
 def search_student_by_key(keyword):
-    g = load_students_to_graph("data/students.xml")
+    store = get_store()
     keyword = keyword.lower()
 
-    q = f"""
-    PREFIX ex: <http://example.org/student/>
-
-    SELECT ?id ?name ?programme ?email ?cgpa
-    WHERE {{
-        ?id a ex:Student ;
-            ex:name ?name ;
-            ex:programme ?programme ;
-            ex:email ?email ;
-            ex:cgpa ?cgpa .
-        FILTER(
-            CONTAINS(LCASE(STR(?name)), "{keyword}") ||
-            CONTAINS(LCASE(STR(?programme)), "{keyword}") ||
-            CONTAINS(LCASE(STR(?email)), "{keyword}") ||
-            CONTAINS(LCASE(STR(?id)), "{keyword}")
-        )
-    }}
-    """
-
-    results = list(g.query(q))
-    clear_screen()
-    
-    if results:
+    def show_page(total, student_ids, first):
+        clear_screen()
         print("Search result that match \"",keyword,"\":")
         print("-" * 105)
         print(f"{'ID':<10}{'Name':<20}{'Programme':<35}{'Email':<35}{'CGPA':<10}")
         print("-" * 105)
-        for row in results:
-            student_id = row.id.split("/")[-1]
-            print(f"{student_id:<10}{row.name:<20}{row.programme:<35}{row.email:<35}{row.cgpa:<10}")
+        for sid in student_ids:
+            s = store.get_student(sid)
+            print(f"{s.id:<10}{s.name:<20}{s.programme:<35}{s.email:<35}{s.cgpa:<10.2f}")
         print("-" * 105)
-    else:
+        print(f"Results {first}-{first + len(student_ids) - 1} of {total}")
+
+    if get_search_index("student").search(keyword, limit=1)[0] == 0:
+        clear_screen()
         print("No student found with that keyword.")
+        return
+    page_through("student", keyword, show_page)
 
-def edit_student_by_id(student_id, xml_file="data/students.xml"):
-    if not os.path.exists(xml_file):
+def edit_student_by_id(student_id):
+    if not os.path.exists(STUDENT_FILE):
         print("Student XML file not found.")
         return
 
-    tree = ET.parse(xml_file)
-    root = tree.getroot()
+    store = get_store()
 
     programmes = {
         '1': "Degree in Computer Science (AI)",
@@ -90,390 +68,255 @@ def edit_student_by_id(student_id, xml_file="data/students.xml"):
         '4': "Degree in Computer Science (BIA)"
     }
 
-    for student in root.findall("student"):
-        if student.get("id") == student_id:
-            print(f"\nEditing student {student_id}")
-
-            current_name = student.find("name").text
-            current_programme = student.find("programme").text
-            current_email = student.find("email").text
+    student = store.get_student(student_id)
+    if student is None:
+        print("Student ID not found.")
+        return
 
-            print(f"Current name: {current_name}")
-            new_name = input("New name (leave blank to keep): ")
-            if new_name.strip():
-                student.find("name").text = new_name
+    print(f"\nEditing student {student_id}")
+    changes = {}
 
-            print(f"Current programme: {current_programme}")
-            print("\nSelect new programme (leave blank to keep current):")
-            for key, value in programmes.items():
-                print(f"{key}. {value}")
+    print(f"Current name: {student.name}")
+    new_name = input("New name (leave blank to keep): ")
+    if new_name.strip():
+        changes["name"] = new_name
 
-            new_programme_choice = input("Enter option number [1-4] or leave blank: ").strip()
-            if new_programme_choice in programmes:
-                student.find("programme").text = programmes[new_programme_choice]
+    print(f"Current programme: {student.programme}")
+    print("\nSelect new programme (leave blank to keep current):")
+    for key, value in programmes.items():
+        print(f"{key}. {value}")
 
-            print(f"Current email: {current_email}")
-            new_email = input("New email (leave blank to keep): ")
-            if new_email.strip():
-                student.find("email").text = new_email
+    new_programme_choice = input("Enter option number [1-4] or leave blank: ").strip()
+    if new_programme_choice in programmes:
+        changes["programme"] = programmes[new_programme_choice]
 
-            tree.write(xml_file)
-            print("Student record updated.")
-            load_students_to_graph("data/students.xml")
-            return
+    print(f"Current email: {student.email}")
+    new_email = input("New email (leave blank to keep): ")
+    if new_email.strip():
+        changes["email"] = new_email
 
-    print("Student ID not found.")
+    store.update_student(student_id, **changes)
+    print("Student record updated.")
 
 #Subject Module
 
 def load_subjects_to_graph():
-    g = Graph()
-    g.bind("ex", EX)
-
-    if not os.path.exists(SUBJECT_FILE):
-        return g
-
-    tree = ET.parse(SUBJECT_FILE)
-    root = tree.getroot()
-
-    for subj in root.findall("subject"):
-        code = subj.get("code")
-        name = subj.find("name").text
-        credit = subj.find("credit").text
-        programme = subj.find("programme").text if subj.find("programme") is not None else "For All Programmes"
-        prereq_elem = subj.find("prerequisite")
-        prerequisite = prereq_elem.text if prereq_elem is not None else None
-
-        subj_uri = URIRef(f"http://example.org/subject/{code}")
-
-        g.add((subj_uri, RDF.type, EX.Subject))
-        g.add((subj_uri, EX.code, Literal(code)))
-        g.add((subj_uri, EX.name, Literal(name)))
-        g.add((subj_uri, EX.credit, Literal(credit)))
-        g.add((subj_uri, EX.programme, Literal(programme)))
-
-        if prerequisite and prerequisite.strip():
-            g.add((subj_uri, EX.prerequisite, Literal(prerequisite.strip())))
-
-    # Save the graph to an RDF file
-    g.serialize("data/subjects.rdf", "xml")
-
-    return g
+    return _rdf_graph().get_graph("subject")
 
 def search_subject_by_key(key):
-    g = load_subjects_to_graph()
-    q = f"""
-    SELECT ?code ?name ?credit ?programme ?prerequisite
-    WHERE {{
-        ?s a <http://example.org/Subject> ;
-           <http://example.org/code> ?code ;
-           <http://example.org/name> ?name ;
-           <http://example.org/credit> ?credit ;
-           <http://example.org/programme> ?programme.
-        OPTIONAL {{ ?s <http://example.org/prerequisite> ?prerequisite. }}
-
-        FILTER(
-            CONTAINS(LCASE(STR(?code)), LCASE("{key}")) ||
-            CONTAINS(LCASE(STR(?name)), LCASE("{key}"))
-        )
-    }}
-    """
-    results = list(g.query(q))
-    
-    if results:
+    store = get_store()
+
+    def show_page(total, codes, first):
         print(f'Search results that match "{key}":')
         print("-" * 110)
         print(f"{'Code':<10}{'Name':<30}{'Credit Hour':<13}{'Programme':<35}{'Prerequisite':<20}")
         print("-" * 110)
-        for row in results:
-            prerequisite = row.prerequisite.split("/")[-1] if row.prerequisite else "None"
-            print(f"{row.code:<10}{row.name:<30}{row.credit:<13}{row.programme:<35}{prerequisite:<20}")
+        for code in codes:
+            subj = store.get_subject(code)
+            programme = subj.programme or "For All Programmes"
+            prerequisite = subj.prerequisite or "None"
+            print(f"{subj.code:<10}{subj.name:<30}{subj.credit:<13}{programme:<35}{prerequisite:<20}")
         print("-" * 110)
-    else:
+        print(f"Results {first}-{first + len(codes) - 1} of {total}")
+
+    if get_search_index("subject").search(key, limit=1)[0] == 0:
         print("No subject found with that keyword.")
+        return
+    page_through("subject", key, show_page)
 
 def edit_subject_by_code(code):
-    tree = ET.parse(SUBJECT_FILE)
-    root = tree.getroot()
-
-    for subject in root.findall("subject"):
-        if subject.attrib['code'] == code:
-            clear_screen()
-            print("Reminder: Subject code can't be changed. If you wish to do so, please delete the subject instead.")
-            print("        : Leave input empty to keep the existing value.")
-
-            current_name = subject.find("name").text
-            current_credit = subject.find("credit").text
-            current_grading = subject.find("grading").text
-            current_programme = subject.find("programme").text if subject.find("programme") is not None else "Not Set"
-            current_prereq = subject.find("prerequisite").text if subject.find("prerequisite") is not None else ""
-
-            name = input(f"\nEnter new name (current: {current_name}): ").strip()
-            if name:
-                subject.find("name").text = name
-
-            while True:
-                credit = input(f"Enter new credit hour (current: {current_credit}): ").strip()
-                if not credit:
-                    break
-                elif credit.isdigit() and int(credit) > 0:
-                    subject.find("credit").text = credit
-                    break
-                else:
-                    print("Invalid credit hour. Must be a positive integer.")
-
-            grading_display = "With Grade (A, B, C)" if current_grading == 'G' else "Pass/Fail"
-            print(f"\nCurrent grading system: {grading_display}")
-            print("Enter new grading system (leave empty to keep current):")
-            print("1. With Grade (e.g., A, B, C)")
-            print("2. Pass/Fail Only")
-            while True:
-                choice = input("Select [1-2]: ").strip()
-                if not choice:
-                    break
-                elif choice == '1':
-                    subject.find("grading").text = 'G'
-                    break
-                elif choice == '2':
-                    subject.find("grading").text = 'P'
-                    break
-                else:
-                    print("Invalid selection. Please choose 1 or 2.\n")
-
-            # Programme selection
-            print(f"\nCurrent programme: {current_programme}")
-            programmes = ["Degree in Computer Science (AI)", "Degree in Computer Science (ST)", "Degree in Computer Science (DCN)", "Degree in Computer Science (BIA)", "For All Programmes"]
-            for idx, prog in enumerate(programmes, start=1):
-                print(f"{idx}. {prog}")
-            prog_choice = input("Select new programme [1-5] (leave blank to keep current): ").strip()
-            if prog_choice.isdigit() and 1 <= int(prog_choice) <= len(programmes):
-                selected_prog = programmes[int(prog_choice) - 1]
-                if subject.find("programme") is None:
-                    ET.SubElement(subject, "programme").text = selected_prog
-                else:
-                    subject.find("programme").text = selected_prog
-
-            # Prerequisite subject
-            print(f"\nCurrent prerequisite subject: {current_prereq or 'None'}")
-            new_prereq = input("Enter new prerequisite subject code (leave blank for none): ").strip()
-            if new_prereq:
-                if subject.find("prerequisite") is None:
-                    ET.SubElement(subject, "prerequisite").text = new_prereq
-                else:
-                    subject.find("prerequisite").text = new_prereq
-            else:
-                if subject.find("prerequisite") is not None:
-                    subject.remove(subject.find("prerequisite"))
-
-            # Save changes
-            tree.write(SUBJECT_FILE)
-
-            # Show updated info
-            clear_screen()
-            print("\nSubject updated successfully. Latest information:")
-            print("-" * 60)
-            print(f"Code        : {subject.attrib['code']}")
-            print(f"Name        : {subject.find('name').text}")
-            print(f"Credit Hour : {subject.find('credit').text}")
-            updated_grading = subject.find("grading").text
-            grading_text = "With Grade (A, B, C)" if updated_grading == 'G' else "Pass/Fail Only"
-            print(f"Grading     : {grading_text}")
-            print(f"Programme   : {subject.find('programme').text}")
-            updated_prereq = subject.find('prerequisite').text if subject.find('prerequisite') is not None else "None"
-            print(f"Prerequisite: {updated_prereq}")
-            print("-" * 60)
-            return
-
-    print("Subject code not found.")
-
-# Grading module
-
-def load_grades_to_graph():
-    G = Graph()
-    GR = Namespace("http://example.org/grade#")
+    store = get_store()
+    subject = store.get_subject(code)
+    if subject is None:
+        print("Subject code not found.")
+        return
 
-    tree = ET.parse(GRADE_FILE)
-    root = tree.getroot()
+    clear_screen()
+    print("Reminder: Subject code can't be changed. If you wish to do so, please delete the subject instead.")
+    print("        : Leave input empty to keep the existing value.")
+
+    current_name = subject.name
+    current_credit = subject.credit
+    current_grading = subject.grading
+    current_programme = subject.programme or "Not Set"
+    current_prereq = subject.prerequisite
+    changes = {}
+
+    name = input(f"\nEnter new name (current: {current_name}): ").strip()
+    if name:
+        changes["name"] = name
+
+    while True:
+        credit = input(f"Enter new credit hour (current: {current_credit}): ").strip()
+        if not credit:
+            break
+        elif credit.isdigit() and int(credit) > 0:
+            changes["credit"] = int(credit)
+            break
+        else:
+            print("Invalid credit hour. Must be a positive integer.")
+
+    grading_display = "With Grade (A, B, C)" if current_grading == 'G' else "Pass/Fail"
+    print(f"\nCurrent grading system: {grading_display}")
+    print("Enter new grading system (leave empty to keep current):")
+    print("1. With Grade (e.g., A, B, C)")
+    print("2. Pass/Fail Only")
+    while True:
+        choice = input("Select [1-2]: ").strip()
+        if not choice:
+            break
+        elif choice == '1':
+            changes["grading"] = 'G'
+            break
+        elif choice == '2':
+            changes["grading"] = 'P'
+            break
+        else:
+            print("Invalid selection. Please choose 1 or 2.\n")
+
+    # Programme selection
+    print(f"\nCurrent programme: {current_programme}")
+    programmes = ["Degree in Computer Science (AI)", "Degree in Computer Science (ST)", "Degree in Computer Science (DCN)", "Degree in Computer Science (BIA)", "For All Programmes"]
+    for idx, prog in enumerate(programmes, start=1):
+        print(f"{idx}. {prog}")
+    prog_choice = input("Select new programme [1-5] (leave blank to keep current): ").strip()
+    if prog_choice.isdigit() and 1 <= int(prog_choice) <= len(programmes):
+        changes["programme"] = programmes[int(prog_choice) - 1]
+
+    # Prerequisite subject
+    print(f"\nCurrent prerequisite subject: {current_prereq or 'None'}")
+    while True:
+        new_prereq = input("Enter new prerequisite subject code(s), combined with AND / OR"
+                           " (leave blank for none): ").strip()
+        error = prerequisite_error(code, new_prereq)
+        if error is None:
+            break
+        print(error)
+    changes["prerequisite"] = new_prereq
 
-    for grade in root.findall("grade"):
-        sid = grade.get("student_id")
-        subject_code = grade.get("subject_code")
-        mark = grade.find("mark").text
-        grade_val = grade.find("grade_value").text
-        gpa = grade.find("gpa").text
+    # Save changes
+    subject = store.update_subject(code, **changes)
 
-        grade_uri = URIRef(f"http://example.org/grade/{sid}_{subject_code}")
-        G.add((grade_uri, RDF.type, GR.Grade))
-        G.add((grade_uri, GR.student_id, Literal(sid)))
-        G.add((grade_uri, GR.subject_code, Literal(subject_code)))
-        G.add((grade_uri, GR.mark, Literal(mark)))
-        G.add((grade_uri, GR.grade_value, Literal(grade_val)))
-        G.add((grade_uri, GR.gpa, Literal(gpa)))
+    # Show updated info
+    clear_screen()
+    print("\nSubject updated successfully. Latest information:")
+    print("-" * 60)
+    print(f"Code        : {subject.code}")
+    print(f"Name        : {subject.name}")
+    print(f"Credit Hour : {subject.credit}")
+    grading_text = "With Grade (A, B, C)" if subject.grading == 'G' else "Pass/Fail Only"
+    print(f"Grading     : {grading_text}")
+    print(f"Programme   : {subject.programme}")
+    print(f"Prerequisite: {subject.prerequisite or 'None'}")
+    print("-" * 60)
 
-    # Save the graph to an RDF file
-    G.serialize("data/grades.rdf", "xml")
+# Grading module
 
-    return G
+def load_grades_to_graph():
+    return _rdf_graph().get_graph("grade")
 
 def edit_grade(student_id, subject_code):
-    grades_file = GRADE_FILE
-
-    if not os.path.exists(grades_file):
+    if not os.path.exists(GRADE_FILE):
         print("grades.xml file not found.")
         return
 
-    tree = ET.parse(grades_file)
-    root = tree.getroot()
-
-    found = False
-    for grade in root.findall("grade"):
-        if grade.get("student_id") == student_id and grade.get("subject_code") == subject_code:
-            found = True
-            current_mark = grade.find("mark").text
-            print(f"Current mark: {current_mark}")
-            new_mark = input("Enter new mark: ").strip()
-
-            if not new_mark.isdigit() or not (0 <= int(new_mark) <= 100):
-                print("Invalid mark. Please enter a number between 0 and 100.")
-                return
-
-            # Get grading type from subjects.xml
-            grading_type = None
-            subject_tree = ET.parse(SUBJECT_FILE)
-            subject_root = subject_tree.getroot()
-            for sub in subject_root.findall("subject"):
-                if sub.get("code") == subject_code:
-                    grading_type = sub.find("grading").text
-                    break
-
-            if grading_type is None:
-                print("Grading type not found for the subject.")
-                return
-            
-            grade_val, gpa = calculate_grade(new_mark, grading_type)
-
-            # Update values in XML
-            grade.find("mark").text = new_mark
-            grade.find("grade_value").text = grade_val
-            grade.find("gpa").text = str(gpa)
-
-            tree.write(grades_file)
-            update_cgpa(student_id)
-            print("Grade updated successfully, please find below for reference.")
-
-            # Re-fetch student to get updated CGPA and CH
-            if not os.path.exists(STUDENT_FILE):
-                print("students.xml file not found.")
-                return
-
-            student_tree = ET.parse(STUDENT_FILE)
-            student_root = student_tree.getroot()
-
-            for stu in student_root.findall("student"):
-                if stu.get("id") == student_id:
-                    cgpa = stu.find("cgpa").text
-                    taken_CH = stu.find("taken_CH").text
-                    break
-            else:
-                print("Student not found.")
-                return
-
-            # Get credit hour from subjects.xml
-            if not os.path.exists(SUBJECT_FILE):
-                print("subjects.xml file not found.")
-                return
-
-            subject_tree = ET.parse(SUBJECT_FILE)
-            subject_root = subject_tree.getroot()
-
-            credit_hour = "N/A"
-            for subject in subject_root.findall("subject"):
-                if subject.get("code") == subject_code:
-                    credit_hour = subject.find("credit").text
-                    break
-
-            # Display summary
-            clear_screen()
-            print("\nGrade Summary for [",student_id,"]:")
-            print("=" * 56)
-            print(f"{'Subject Code':<15}{'Mark':<10}{'Grade':<10}{'GPA':<10}{'Credit Hour':<15}")
-            print(f"{subject_code:<15}{str(new_mark) + '%':<10}{grade_val:<10}{gpa:<10.2f}{credit_hour:<15}")
-            print("=" * 56)
-
-            # Display CGPA & CH
-            print(f"\n{'Total Taken Credit Hours':<25}: {taken_CH}")
-            print(f"{'Latest CGPA':<25}: {cgpa}")
-            break
-
-    if not found:
+    store = get_store()
+    grade = store.get_grade(student_id, subject_code)
+    if grade is None:
         print("Grade not found for the given student ID and subject code.")
+        return
 
-def search_grade_by_key(key):
-    G = load_grades_to_graph()
-    GR = Namespace("http://example.org/grade#")
+    print(f"Current mark: {grade.mark}")
+    new_mark = input("Enter new mark: ").strip()
+
+    if not new_mark.isdigit() or not (0 <= int(new_mark) <= 100):
+        print("Invalid mark. Please enter a number between 0 and 100.")
+        return
 
-    query = f"""
-    PREFIX gr: <http://example.org/grade#>
+    # Get grading type from subjects.xml
+    subject = store.get_subject(subject_code)
+    if subject is None:
+        print("Grading type not found for the subject.")
+        return
+
+    grade_val, gpa = calculate_grade(new_mark, subject.grading)
 
-    SELECT ?student_id ?subject_code ?mark ?grade_value ?gpa
-    WHERE {{
-        ?grade a gr:Grade ;
-               gr:student_id ?student_id ;
-               gr:subject_code ?subject_code ;
-               gr:mark ?mark ;
-               gr:grade_value ?grade_value ;
-               gr:gpa ?gpa .
+    # Update values in XML
+    # (the store also applies the change to the student's CGPA)
+    store.update_grade(student_id, subject_code, mark=int(new_mark), grade_value=grade_val, gpa=gpa)
+    print("Grade updated successfully, please find below for reference.")
 
-        FILTER (CONTAINS(LCASE(STR(?student_id)), LCASE("{key}")) ||
-                CONTAINS(LCASE(STR(?subject_code)), LCASE("{key}")))
-    }}
-    """
+    # Re-fetch student to get updated CGPA and CH
+    student = store.get_student(student_id)
+    if student is None:
+        print("Student not found.")
+        return
 
-    results = list(G.query(query))
+    cgpa = student.cgpa
+    taken_CH = student.taken_ch
+    credit_hour = subject.credit
 
+    # Display summary
     clear_screen()
-    print(f"\nSearching for grades related to: {key}")
-    if results:
+    print("\nGrade Summary for [",student_id,"]:")
+    print("=" * 56)
+    print(f"{'Subject Code':<15}{'Mark':<10}{'Grade':<10}{'GPA':<10}{'Credit Hour':<15}")
+    print(f"{subject_code:<15}{str(new_mark) + '%':<10}{grade_val:<10}{gpa:<10.2f}{credit_hour:<15}")
+    print("=" * 56)
+
+    # Display CGPA & CH
+    print(f"\n{'Total Taken Credit Hours':<25}: {taken_CH}")
+    print(f"{'Latest CGPA':<25}: {cgpa:.2f}")
+
+def search_grade_by_key(key):
+    store = get_store()
+
+    def show_page(total, keys, first):
+        clear_screen()
+        print(f"\nSearching for grades related to: {key}")
         print("=" * 70)
         print(f"{'Student ID':<15}{'Subject Code':<15}{'Mark':<10}{'Grade':<10}{'GPA':<10}")
         print("=" * 70)
-        for row in results:
+        for student_id, subject_code in keys:
+            grade = store.get_grade(student_id, subject_code)
             # Format mark with % and gpa with 2 decimal places
-            try:
-                mark = f"{int(row.mark)}%"
-            except:
-                mark = row.mark
-            try:
-                gpa = f"{float(row.gpa):.2f}"
-            except:
-                gpa = row.gpa
-
-            print(f"{row.student_id:<15}{row.subject_code:<15}{mark:<10}{row.grade_value:<10}{gpa:<10}")
+            mark = f"{grade.mark}%"
+            gpa = f"{grade.gpa:.2f}"
+
+            print(f"{student_id:<15}{subject_code:<15}{mark:<10}{grade.grade_value:<10}{gpa:<10}")
         print("=" * 70)
-    else:
+        print(f"Results {first}-{first + len(keys) - 1} of {total}")
+
+    if get_search_index("grade").search(key, limit=1)[0] == 0:
+        clear_screen()
+        print(f"\nSearching for grades related to: {key}")
         print("No matching grade records found.")
+        return
+    page_through("grade", key, show_page)
+
+def show_programme_average_marks():
+    rdf = _rdf_graph()
+    rdf.get_graph("student")
+    rdf.get_graph("grade")
+    rows = run_query("programme_average_mark", rdf.get_dataset())
+    print("\nAverage Mark per Programme")
+    print("-" * 60)
+    print(f"{'Programme':<35}{'Grades':<10}{'Avg Mark':<10}")
+    print("-" * 60)
+    for row in rows:
+        print(f"{str(row.programme):<35}{int(row.grades):<10}{float(row.average):<10.2f}")
+    print("-" * 60)
 
 def recommend_subjects_rdf(student_id):
-    EX = Namespace("http://example.org/")
-    EXS = Namespace("http://example.org/student/")
-
-    GRADE_FILE = "xml/grade.xml"
-
-    g = Graph()
-    g.parse("data/subjects.rdf", format="xml")
-    g.parse("data/students.rdf", format="xml")
-
-    student_uri = EXS[student_id]
+    rdf = _rdf_graph()
+    rdf.get_graph("student")
+    subject_graph = rdf.get_graph("subject")
 
     # Step 1: Get student's programme
-    student_prog_query = f"""
-    PREFIX stu: <http://example.org/student/>
-
-    SELECT ?programme WHERE {{
-        stu:{student_id} stu:programme ?programme .
-    }}
-    """
-    res = g.query(student_prog_query)
+    if get_store().get_student(student_id) is None:
+        print(f"No programme found for student {student_id}.")
+        return
+    res = run_query("student_programme", rdf.get_dataset(), student=rdf.student_uri(student_id))
     programme = None
     for row in res:
         programme = str(row.programme)
@@ -483,40 +326,15 @@ def recommend_subjects_rdf(student_id):
         print(f"No programme found for student {student_id}.")
         return
 
-    # Step 2: Query all eligible subjects (matching programme & passed prerequisite)
-    query = f"""
-    PREFIX : <http://example.org/>
-    PREFIX stu: <http://example.org/student/>
-
-    SELECT ?subject ?code ?name
-    WHERE {{
-        ?subject a :Subject ;
-                 :programme ?prog ;
-                 :code ?code ;
-                 :name ?name .
-
-        FILTER(?prog = "{programme}" || ?prog = "For All Programmes")
-
-        OPTIONAL {{ ?subject :prerequisite ?prereq . }}
-
-        FILTER NOT EXISTS {{
-            ?subject :prerequisite ?prereq .
-            FILTER NOT EXISTS {{ stu:{student_id} :hasPassed ?prereq . }}
-        }}
-    }}
-    ORDER BY ?code
-    """
-
-    results = g.query(query)
-
-    # Step 3: Filter out already-passed subjects using your XML logic
+    # Step 2: Look up the subjects the student is eligible for (materialised
+    # :eligibleFor triples) and their names
+    inferred_graph = rdf.load_inferred_graph()
     recommended = []
-    for row in results:
-        subject_code = str(row.code)
-        if not has_passed(student_id, subject_code):
-            recommended.append((subject_code, str(row.name)))
+    for subject in inferred_graph.objects(rdf.student_uri(student_id), rdf.EX.eligibleFor):
+        recommended.append((str(subject_graph.value(subject, rdf.EX.code)), str(subject_graph.value(subject, rdf.EX.name))))
+    recommended.sort()
 
-    # Step 4: Display
+    # Step 3: Display
     print(f"\n")
     print("-" * 70)
     print(f"Recommended subjects for {student_id} ({programme}):")
@@ -528,80 +346,6 @@ def recommend_subjects_rdf(student_id):
     for code, name in recommended:
         print(f"{code}: {name}")
 
-# Dashboard
-
-def show_top_3_students():
-    g = load_students_to_graph("data/students.xml")
-
-    query = """
-    PREFIX stud: <http://example.org/student/>
-
-    SELECT ?s ?name ?cgpa
-    WHERE {
-        ?s a stud:Student ;
-           stud:name ?name ;
-           stud:cgpa ?cgpa .
-    }
-    ORDER BY DESC(xsd:decimal(?cgpa))
-    LIMIT 3
-    """
-
-    results = list(g.query(query, initNs={"xsd": Namespace("http://www.w3.org/2001/XMLSchema#")}))
-
-    print("\nTop 3 Students by CGPA")
-    print("-" * 60)
-    print(f"{'ID':<10}{'Name':<25}{'CGPA':<10}")
-    print("-" * 60)
-    for row in results:
-        student_id = row.s.split("/")[-1]
-        print(f"{student_id:<10}{row.name:<25}{float(row.cgpa):<10.2f}")
-
-def show_student_summary():
-    g = load_students_to_graph("data/students.xml")
-
-    query = """
-    PREFIX stud: <http://example.org/student/>
-    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
-
-    SELECT (COUNT(?s) AS ?total) (AVG(xsd:decimal(?cgpa)) AS ?average)
-    WHERE {
-        ?s a stud:Student ;
-           stud:cgpa ?cgpa .
-    }
-    """
-
-    results = list(g.query(query))
-    for row in results:
-        print("\nStudent Summary")
-        print("-" * 60)
-        print(f"Total Students      : {row.total}")
-        print(f"Average CGPA        : {float(row.average):.2f}")
-
-def show_failure_insight():
-    g = load_grades_to_graph()
-
-    query = """
-    PREFIX gr: <http://example.org/grade#>
-
-    SELECT ?subject_code (COUNT(?g) AS ?failures)
-    WHERE {
-        ?g a gr:Grade ;
-           gr:subject_code ?subject_code ;
-           gr:gpa ?gpa .
-        FILTER(xsd:float(?gpa) <= 0.0)
-    }
-    GROUP BY ?subject_code
-    ORDER BY DESC(?failures)
-    LIMIT 1
-    """
-
-    results = list(g.query(query, initNs={"xsd": Namespace("http://www.w3.org/2001/XMLSchema#")}))
-    for row in results:
-        print("\nSubject with Highest Failure Rate")
-        print("-" * 60)
-        print(f"Subject Code        : {row.subject_code}")
-        print(f"Failure Count       : {row.failures}\n")
-
 # If this file is executed, redirect to main.py
 if __name__ == "__main__":
     import main
@@ -0,0 +1,101 @@
+# Paginated PDF table reports.
+#
+# Rows are taken from an iterator one at a time (usually one of the streaming
+# readers in data_store.py), so the whole XML file is never loaded to build a
+# report. Every page repeats the report title and the table header and has a
+# page number in the footer. A report can be split into several files, one
+# per group (e.g. per programme) and/or one per chunk of N rows; only the
+# files still being filled are kept in memory. The FPDF document class is
+# in table_pdf.py, imported when the first report is written.
+
+import os
+import re
+
+
+def _file_label(text):
+    return re.sub(r"[^A-Za-z0-9]+", "_", str(text)).strip("_") or "none"
+
+
+def write_table_report(output_path, title, headers, widths, rows, chunk_rows=None, group_by=None):
+    """Write rows to one or more paginated PDF files and return their paths.
+
+    rows is any iterable of row tuples. If group_by is a column index, rows
+    are written to one file per value of that column, named
+    <output>_<value>.pdf. If chunk_rows is set, a new file is started after
+    every chunk_rows rows, named <output>_001.pdf, <output>_002.pdf, ...
+    """
+    from table_pdf import TablePDF
+
+    base, ext = os.path.splitext(output_path)
+    open_docs = {}  # group -> (TablePDF, part number)
+    written = []
+
+    def doc_path(group, part):
+        path = base
+        if group_by is not None:
+            path += "_" + _file_label(group)
+        if chunk_rows:
+            path += f"_{part:03}"
+        return path + ext
+
+    def doc_title(group, part):
+        text = title
+        if group_by is not None:
+            text += f" - {group}"
+        if chunk_rows:
+            text += f" (Part {part})"
+        return text
+
+    def finish(group):
+        pdf, part = open_docs.pop(group)
+        path = doc_path(group, part)
+        pdf.output(path)
+        written.append(path)
+        return part
+
+    for row in rows:
+        group = row[group_by] if group_by is not None else None
+        doc = open_docs.get(group)
+        if doc is None:
+            doc = open_docs[group] = (TablePDF(doc_title(group, 1), headers, widths), 1)
+        elif chunk_rows and doc[0].rows >= chunk_rows:
+            part = finish(group) + 1
+            doc = open_docs[group] = (TablePDF(doc_title(group, part), headers, widths), part)
+        doc[0].add_row(row)
+
+    for group in list(open_docs):
+        finish(group)
+
+    if not written:
+        # No rows: still write the report with just the header
+        TablePDF(title, headers, widths).output(output_path)
+        written.append(output_path)
+    return written
+
+
+def print_report_paths(paths):
+    if len(paths) == 1:
+        print(f"\nPDF generated successfully: {paths[0]}")
+        return
+    print(f"\n{len(paths)} PDF files generated successfully:")
+    for path in paths:
+        print(f"  {path}")
+
+
+def ask_report_split(group_label):
+    """Ask how a report should be split; return (chunk_rows, split_by_group)."""
+    print("1. Single file\n2. One file per " + group_label + "\n3. One file per N rows")
+    choice = input("Select output [1-3] (default 1): ").strip()
+    if choice == '2':
+        return None, True
+    if choice == '3':
+        size = input("Rows per file: ").strip()
+        if size.isdigit() and int(size) > 0:
+            return int(size), False
+        print("Invalid number of rows, writing a single file.")
+    return None, False
+
+# If this file is executed, redirect to main.py
+if __name__ == "__main__":
+    import main
+    main.main()
@@ -0,0 +1,205 @@
+# Inverted index for the student, subject and grade searches.
+#
+# Every distinct field value is broken into its 3-character grams and each
+# gram points at the values containing it; each value points at the records
+# that have it. A search intersects the gram postings of the keyword,
+# confirms the substring match on the (few) candidate values and ranks the
+# records. Values shared by many records, such as a programme name, are
+# indexed once. The indexes follow store change events, so they are built
+# only once per run.
+
+import heapq
+from collections import defaultdict
+
+from data_store import *
+
+SEARCH_PAGE_SIZE = 20
+GRAM_SIZE = 3
+
+
+def _grams(text):
+    return {text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)}
+
+
+def _match_quality(keyword, value):
+    # how well the keyword matches one field value, 0 if it does not
+    if value == keyword:
+        return 4
+    if value.startswith(keyword):
+        return 3
+    pos = value.find(keyword)
+    if pos < 0:
+        return 0
+    if not value[pos - 1].isalnum():
+        return 2  # start of a word
+    return 1
+
+
+class SearchIndex:
+    """Substring index over a fixed list of weighted text fields."""
+
+    def __init__(self, weights):
+        self.weights = weights  # one weight per field
+        self._docs = {}         # doc ID -> tuple of (field, value) keys
+        self._values = {}       # (field, value) -> set of doc IDs
+        self._grams = defaultdict(set)  # gram -> set of (field, value)
+        self._short = set()     # (field, value) too short to have a gram
+
+    def __len__(self):
+        return len(self._docs)
+
+    def add(self, doc_id, fields):
+        if doc_id in self._docs:
+            self.remove(doc_id)
+        keys = tuple((i, str(value).lower()) for i, value in enumerate(fields))
+        self._docs[doc_id] = keys
+        values = self._values
+        grams = self._grams
+        for key in keys:
+            docs = values.get(key)
+            if docs is None:
+                docs = values[key] = set()
+                if len(key[1]) < GRAM_SIZE:
+                    self._short.add(key)
+                for gram in _grams(key[1]):
+                    grams[gram].add(key)
+            docs.add(doc_id)
+
+    def remove(self, doc_id):
+        keys = self._docs.pop(doc_id, None)
+        if keys is None:
+            return
+        for key in keys:
+            docs = self._values[key]
+            docs.discard(doc_id)
+            if docs:
+                continue
+            del self._values[key]
+            self._short.discard(key)
+            for gram in _grams(key[1]):
+                postings = self._grams[gram]
+                postings.discard(key)
+                if not postings:
+                    del self._grams[gram]
+
+    def _matching_values(self, keyword):
+        if len(keyword) == GRAM_SIZE:
+            return set(self._grams.get(keyword, ()))
+        if len(keyword) < GRAM_SIZE:
+            # shorter than a gram: take every gram that contains it
+            matches = {key for key in self._short if keyword in key[1]}
+            for gram, keys in self._grams.items():
+                if keyword in gram:
+                    matches |= keys
+            return matches
+        postings = []
+        for i in range(len(keyword) - GRAM_SIZE + 1):
+            found = self._grams.get(keyword[i:i + GRAM_SIZE])
+            if not found:
+                return set()
+            postings.append(found)
+        postings.sort(key=len)
+        candidates = set.intersection(*postings)
+        return {key for key in candidates if keyword in key[1]}
+
+    def search(self, keyword, limit=SEARCH_PAGE_SIZE, offset=0):
+        """Return (total matches, doc IDs of the requested page), best first.
+
+        A record matches when the keyword is a case-insensitive substring of
+        any of its fields. Records are ranked by field weight and by whether
+        the keyword matches the whole value, its start, the start of a word
+        or just somewhere inside it; ties keep doc ID order.
+        """
+        keyword = keyword.lower()
+        if not keyword:
+            total = len(self._docs)
+            return total, sorted(self._docs)[offset:offset + limit]
+
+        # group the matching records by score; a record takes the score
+        # of its best matching field
+        by_score = {}
+        for key in self._matching_values(keyword):
+            field, value = key
+            score = self.weights[field] * _match_quality(keyword, value)
+            by_score.setdefault(score, []).append(self._values[key])
+        if not by_score:
+            return 0, []
+        total = len(set().union(*[docs for groups in by_score.values() for docs in groups]))
+
+        wanted = offset + limit
+        ranked = []
+        seen = set()
+        for score in sorted(by_score, reverse=True):
+            docs = set().union(*by_score[score]) - seen
+            seen |= docs
+            ranked.extend(heapq.nsmallest(wanted - len(ranked), docs))
+            if len(ranked) >= wanted:
+                break
+        return total, ranked[offset:wanted]
+
+
+def _student_fields(student):
+    return (student.id, student.name, student.email, student.programme)
+
+def _subject_fields(subject):
+    return (subject.code, subject.name)
+
+def _grade_fields(grade):
+    return (grade.student_id, grade.subject_code)
+
+# kind -> (field weights, store list method, record -> doc ID, record -> fields)
+_INDEXED = {
+    "student": ((4, 3, 2, 1), "list_students", lambda s: s.id, _student_fields),
+    "subject": ((3, 2), "list_subjects", lambda s: s.code, _subject_fields),
+    "grade": ((1, 1), "list_grades", lambda g: (g.student_id, g.subject_code), _grade_fields),
+}
+
+_indexes = {}
+
+def _build_index(kind):
+    weights, list_method, doc_id, fields = _INDEXED[kind]
+    index = SearchIndex(weights)
+    for record in getattr(get_store(), list_method)():
+        index.add(doc_id(record), fields(record))
+    return index
+
+def _on_store_change(kind, key, record):
+    if kind not in _indexes:
+        return
+    if key is None:
+        _indexes[kind] = _build_index(kind)
+    elif record is None:
+        _indexes[kind].remove(key)
+    else:
+        _indexes[kind].add(key, _INDEXED[kind][3](record))
+
+def get_search_index(kind):
+    """Return the search index for "student", "subject" or "grade"."""
+    if not _indexes:
+        get_store().add_listener(_on_store_change)
+    if kind not in _indexes:
+        _indexes[kind] = _build_index(kind)
+    return _indexes[kind]
+
+def page_through(kind, keyword, show_page, page_size=SEARCH_PAGE_SIZE):
+    """Show search results one page at a time.
+
+    show_page(total, doc_ids, first_row_number) prints one page; the user is
+    asked before the next page is fetched.
+    """
+    index = get_search_index(kind)
+    offset = 0
+    while True:
+        total, hits = index.search(keyword, limit=page_size, offset=offset)
+        show_page(total, hits, offset + 1)
+        offset += page_size
+        if offset >= total:
+            return total
+        more = input(f"Showing {offset} of {total}. Press 'n' for the next page, or Enter to stop: ")
+        if more.strip().lower() != 'n':
+            return total
+
+# If this file is executed, redirect to main.py
+if __name__ == "__main__":
+    import main
+    main.main()
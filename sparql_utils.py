@@ -0,0 +1,57 @@
+# Prepared SPARQL queries.
+#
+# Every query is parsed and algebrized once with prepareQuery(), on its
+# first run (the SPARQL parser is only imported then), and user input is
+# passed in through initBindings instead of being pasted into the query
+# text. The registry also records how often each query ran and how long it
+# took.
+
+import time
+
+_queries = {}  # name -> prepared query, or (text, initNs) until the first run
+_stats = {}    # name -> [executions, total seconds, slowest seconds]
+
+
+def register_query(name, text, initNs=None):
+    """Store a query under name; it is prepared when it first runs."""
+    _queries[name] = (text, initNs or {})
+    _stats[name] = [0, 0.0, 0.0]
+
+
+def _prepared(name):
+    query = _queries[name]
+    if isinstance(query, tuple):
+        from rdflib.plugins.sparql import prepareQuery
+        query = _queries[name] = prepareQuery(query[0], initNs=query[1])
+    return query
+
+
+def run_query(name, graph, **bindings):
+    """Run a registered query on graph, binding the given variables.
+
+    The rows are fetched before returning so the recorded time covers the
+    whole evaluation.
+    """
+    query = _prepared(name)
+    start = time.perf_counter()
+    rows = list(graph.query(query, initBindings=bindings))
+    elapsed = time.perf_counter() - start
+
+    stats = _stats[name]
+    stats[0] += 1
+    stats[1] += elapsed
+    stats[2] = max(stats[2], elapsed)
+    return rows
+
+
+def query_stats():
+    """Return [(name, executions, total seconds, slowest seconds)]."""
+    return [(name, *stats) for name, stats in _stats.items()]
+
+
+def show_query_stats():
+    print(f"{'Query':<25}{'Runs':<8}{'Total (ms)':<12}{'Avg (ms)':<12}{'Max (ms)':<12}")
+    print("-" * 69)
+    for name, runs, total, slowest in query_stats():
+        avg = total / runs if runs else 0.0
+        print(f"{name:<25}{runs:<8}{total * 1000:<12.2f}{avg * 1000:<12.2f}{slowest * 1000:<12.2f}")
@@ -0,0 +1,249 @@
+# SQLite backend for the data store, used when STORE_BACKEND is "sqlite".
+#
+# SqliteStore keeps the in-memory records, indexes, CGPA totals, listeners
+# and transactions of DataStore, and only changes where the records are
+# saved: instead of rewriting an XML file, a commit writes just the rows
+# that changed, in one SQLite transaction. The database runs in WAL mode, so
+# readers in other processes are never blocked by a writer, and every
+# statement is a fixed parameterised one that sqlite3 prepares once and
+# keeps in its statement cache.
+#
+# Tables:
+#   students (id PRIMARY KEY, ...)
+#   subjects (code PRIMARY KEY, ...)
+#   grades   (PRIMARY KEY (student_id, subject_code), ...) plus an index on
+#            subject_code; the primary key also serves lookups by student ID
+#   versions (name PRIMARY KEY, version) - bumped by every commit that
+#            changes a table, so a store notices changes made by other
+#            processes the same way it notices a changed XML file.
+#
+# The XML files remain the interchange format: import_xml() loads them
+# (and is run automatically when the database is first created) and
+# export_xml() writes the database back out. From the command line:
+#   python sqlite_store.py import|export
+
+import os
+import sqlite3
+import sys
+from contextlib import contextmanager
+from dataclasses import fields
+
+from data_store import *
+from data_store import _write_lock
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    programme TEXT NOT NULL,
+    email TEXT NOT NULL,
+    taken_ch INTEGER NOT NULL DEFAULT 0,
+    cgpa REAL NOT NULL DEFAULT 0,
+    cgpa_ch INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS subjects (
+    code TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    credit INTEGER NOT NULL,
+    programme TEXT NOT NULL DEFAULT '',
+    prerequisite TEXT NOT NULL DEFAULT '',
+    grading TEXT NOT NULL DEFAULT 'G'
+);
+CREATE TABLE IF NOT EXISTS grades (
+    student_id TEXT NOT NULL,
+    subject_code TEXT NOT NULL,
+    mark INTEGER NOT NULL,
+    grade_value TEXT NOT NULL,
+    gpa REAL NOT NULL,
+    PRIMARY KEY (student_id, subject_code)
+);
+CREATE INDEX IF NOT EXISTS grades_by_subject ON grades (subject_code);
+CREATE TABLE IF NOT EXISTS versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+"""
+
+# kind -> (table, record type, key columns)
+TABLES = {
+    "student": ("students", Student, ("id",)),
+    "subject": ("subjects", Subject, ("code",)),
+    "grade": ("grades", Grade, ("student_id", "subject_code")),
+}
+
+
+def _columns(cls):
+    return [f.name for f in fields(cls)]
+
+def _select_sql(kind, where=()):
+    table, cls, keys = TABLES[kind]
+    sql = f"SELECT {', '.join(_columns(cls))} FROM {table}"
+    if where:
+        sql += " WHERE " + " AND ".join(f"{column} = ?" for column in where)
+    return sql + " ORDER BY rowid"
+
+def _upsert_sql(kind):
+    # an update keeps the row (and its rowid), so records stay in the order
+    # they were added, as in the XML files
+    table, cls, keys = TABLES[kind]
+    columns = _columns(cls)
+    updates = ", ".join(f"{column} = excluded.{column}" for column in columns if column not in keys)
+    return (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))}) "
+            f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET {updates}")
+
+def _delete_sql(kind):
+    table, cls, keys = TABLES[kind]
+    return f"DELETE FROM {table} WHERE " + " AND ".join(f"{column} = ?" for column in keys)
+
+SELECT_ALL = {kind: _select_sql(kind) for kind in TABLES}
+SELECT_GRADES_OF = _select_sql("grade", ("student_id",))
+UPSERT = {kind: _upsert_sql(kind) for kind in TABLES}
+DELETE = {kind: _delete_sql(kind) for kind in TABLES}
+BUMP_VERSION = ("INSERT INTO versions (name, version) VALUES (?, 1) "
+                "ON CONFLICT(name) DO UPDATE SET version = version + 1")
+SELECT_VERSION = "SELECT version FROM versions WHERE name = ?"
+
+
+def _row(record):
+    return tuple(getattr(record, f.name) for f in fields(record))
+
+
+class SqliteStore(DataStore):
+    def __init__(self, path=SQLITE_FILE):
+        # the XML file names stay as the keys of the version checks and as
+        # the default import/export files
+        DataStore.__init__(self)
+        self.path = path
+        created = not os.path.exists(path)
+        # autocommit mode; transactions are begun and ended explicitly
+        self.db = sqlite3.connect(path, isolation_level=None, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute("PRAGMA busy_timeout=10000")
+        self.db.executescript(SCHEMA)
+        self._table_files = {
+            "student": self.student_file,
+            "subject": self.subject_file,
+            "grade": self.grade_file,
+        }
+        if created:
+            self.import_xml()
+
+    # ---------- loading ----------
+
+    def _version(self, path):
+        row = self.db.execute(SELECT_VERSION, (path,)).fetchone()
+        return row[0] if row else 0
+
+    def _load_students(self):
+        self.students = {row[0]: Student(*row) for row in self.db.execute(SELECT_ALL["student"])}
+
+    def _load_subjects(self):
+        self._totals = None
+        self.subjects = {row[0]: Subject(*row) for row in self.db.execute(SELECT_ALL["subject"])}
+
+    def _load_grades(self):
+        self.grades = {}
+        self._grades_by_student = {}
+        self._grades_by_subject = {}
+        self._totals = None
+        for row in self.db.execute(SELECT_ALL["grade"]):
+            self._index_grade(Grade(*row))
+
+    def _stored_grades(self, student_id=None):
+        if student_id is None:
+            rows = self.db.execute(SELECT_ALL["grade"])
+        else:
+            rows = self.db.execute(SELECT_GRADES_OF, (student_id,))
+        return (GradeRow(*row) for row in rows)
+
+    def iter_students(self):
+        for row in self.db.execute(SELECT_ALL["student"]):
+            yield Student(*row)
+
+    def iter_subjects(self):
+        for row in self.db.execute(SELECT_ALL["subject"]):
+            yield Subject(*row)
+
+    # ---------- saving ----------
+
+    @contextmanager
+    def _locked(self):
+        # BEGIN IMMEDIATE takes the database's write lock up front
+        self.db.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self.db.execute("ROLLBACK")
+            raise
+        self.db.execute("COMMIT")
+
+    def _commit(self, tx):
+        # The transaction's events name every record it changed; write the
+        # final state of each (runs inside _locked()).
+        changes = {}
+        for kind, key, record in tx["events"]:
+            if key is not None:
+                changes[kind, key] = record
+        for kind in TABLES:
+            upserts = [_row(record) for (k, key), record in changes.items() if k == kind and record is not None]
+            deletes = [key if kind == "grade" else (key,)
+                       for (k, key), record in changes.items() if k == kind and record is None]
+            if not upserts and not deletes:
+                continue
+            self.db.executemany(DELETE[kind], deletes)
+            self.db.executemany(UPSERT[kind], upserts)
+            path = self._table_files[kind]
+            self.db.execute(BUMP_VERSION, (path,))
+            self._versions[path] = self._version(path)
+
+    def _compact_grades(self):
+        pass  # grades are rows, there is no journal to fold in
+
+    def close(self):
+        self.db.close()
+
+    # ---------- XML interchange ----------
+
+    def import_xml(self, student_file=STUDENT_FILE, subject_file=SUBJECT_FILE, grade_file=GRADE_FILE):
+        """Replace the contents of the database with the XML files (and the
+        grade journal, if any)."""
+        source = DataStore(student_file, subject_file, grade_file)
+        records = {
+            "student": source.list_students(),
+            "subject": source.list_subjects(),
+            "grade": source.list_grades(),
+        }
+        with self._locked():
+            for kind, (table, cls, keys) in TABLES.items():
+                self.db.execute(f"DELETE FROM {table}")
+                self.db.executemany(UPSERT[kind], map(_row, records[kind]))
+                self.db.execute(BUMP_VERSION, (self._table_files[kind],))
+        self._rollback(reloaded=True)  # reload and tell the listeners
+
+    def export_xml(self, student_file=STUDENT_FILE, subject_file=SUBJECT_FILE, grade_file=GRADE_FILE):
+        """Write the contents of the database to the XML files."""
+        students, subjects, grades = self.list_students(), self.list_subjects(), self.list_grades()
+        with _write_lock(grade_file + LOCK_SUFFIX):  # against XML-backend writers
+            write_xml(student_file, students_xml(students))
+            write_xml(subject_file, subjects_xml(subjects))
+            write_xml(grade_file, grades_xml(grades))
+            # the grade file is complete, so an old journal must not be replayed on it
+            GradeJournal(grade_file + JOURNAL_SUFFIX).reset()
+
+# python sqlite_store.py import|export copies between the XML files and the
+# database; otherwise redirect to main.py
+if __name__ == "__main__":
+    if sys.argv[1:] == ["import"]:
+        store = SqliteStore()
+        store.import_xml()
+        print(f"Imported {len(store.students)} students, {len(store.subjects)} subjects "
+              f"and {len(store.grades)} grades into {store.path}.")
+    elif sys.argv[1:] == ["export"]:
+        store = SqliteStore()
+        store.export_xml()
+        print(f"Exported {len(store.students)} students, {len(store.subjects)} subjects "
+              f"and {len(store.grades)} grades to the XML files.")
+    else:
+        import main
+        main.main()
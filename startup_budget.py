@@ -0,0 +1,80 @@
+# Start-up time check.
+#
+# Imports main.py in a fresh interpreter with `python -X importtime` and
+# lists the modules that took longest. The check fails (exit status 1) if
+# importing main takes longer than the budget, or if any of LAZY_MODULES was
+# imported: rdflib, its SPARQL parser, fpdf and NumPy are only to be loaded
+# when they are first used. The fastest of several runs is taken, so one
+# slow run on a busy machine does not fail the check.
+#
+# Usage: python startup_budget.py [--budget MS] [--runs N] [--top N]
+
+import argparse
+import os
+import subprocess
+import sys
+
+STARTUP_BUDGET_MS = 150
+LAZY_MODULES = ("rdflib", "rdflib.plugins.sparql.parser", "fpdf", "numpy")
+
+
+def measure_imports(module="main"):
+    """Import module in a new interpreter and return {module name: (self
+    microseconds, cumulative microseconds)} for everything imported."""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            capture_output=True, text=True, check=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        if self_us.strip().isdigit():  # not the header line
+            times[name.strip()] = (int(self_us), int(cumulative_us))
+    return times
+
+
+def check_startup(budget_ms=STARTUP_BUDGET_MS, runs=5, top=10):
+    """Print the start-up time of main.py and its slowest imports; return a
+    list of problems, empty if the check passed."""
+    best = None
+    for _ in range(runs):
+        times = measure_imports()
+        if best is None or times["main"][1] < best["main"][1]:
+            best = times
+    total_ms = best["main"][1] / 1000
+
+    print(f"{'Module':<45}{'Self (ms)':>12}{'Total (ms)':>12}")
+    print("-" * 69)
+    slowest = sorted(best.items(), key=lambda item: item[1][0], reverse=True)[:top]
+    for name, (self_us, cumulative_us) in slowest:
+        print(f"{name:<45}{self_us / 1000:>12.1f}{cumulative_us / 1000:>12.1f}")
+    print("-" * 69)
+    print(f"import main: {total_ms:.1f} ms (best of {runs}), budget {budget_ms} ms")
+
+    problems = []
+    if total_ms > budget_ms:
+        problems.append(f"import main took {total_ms:.1f} ms, over the {budget_ms} ms budget")
+    for name in LAZY_MODULES:
+        if name in best:
+            problems.append(f"{name} is imported at start-up")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the start-up time of main.py against a budget.")
+    parser.add_argument("--budget", type=float, default=STARTUP_BUDGET_MS, help="budget in milliseconds")
+    parser.add_argument("--runs", type=int, default=5, help="runs to take the fastest of")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list")
+    args = parser.parse_args()
+
+    problems = check_startup(args.budget, args.runs, args.top)
+    for problem in problems:
+        print("FAIL:", problem)
+    if problems:
+        sys.exit(1)
+    print("OK")
+
+
+if __name__ == "__main__":
+    main()
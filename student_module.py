@@ -1,9 +1,9 @@
 import xml.etree.ElementTree as ET
 import os
-from fpdf import FPDF
 
-from subject_module import *
-from grading_module import *
+from data_store import *
+from report_utils import *
+from batch_recommend import *
 from rdf_utils import *
 
 # This function is used to clear the screen
@@ -12,47 +12,21 @@ def clear_screen():
 
 STUDENT_FILE = "data/students.xml"
 
-def generate_student_pdf():
+def _student_report_rows():
+    for student in get_store().iter_students():
+        yield (student.id, student.name, student.programme, student.email, student.taken_ch, f"{student.cgpa:.2f}")
+
+def generate_student_pdf(chunk_rows=None, by_programme=False):
     if not os.path.exists(STUDENT_FILE):
         print("No student records found.")
         return
 
-    tree = ET.parse(STUDENT_FILE)
-    root = tree.getroot()
-
-    pdf = FPDF()
-    pdf = FPDF(orientation='L', unit='mm', format='A4')
-    pdf.add_page()
-    pdf.set_font("Courier", "B", 12)
-    pdf.cell(0, 10, "Student Information", ln=True, align="C")
-
-    # Table Header
-    pdf.set_font("Courier", "B", 10)
     headers = ["ID", "Name", "Programme", "Email", "Taken CH", "CGPA"]
     col_widths = [20, 55, 70, 85, 20, 20]
-    
-    for i in range(len(headers)):
-        pdf.cell(col_widths[i], 10, headers[i], 1)
-    pdf.ln()
-
-    # Table Rows
-    pdf.set_font("Courier", "", 10)
-    for student in root.findall("student"):
-        row = [
-            student.get("id"),
-            student.find("name").text,
-            student.find("programme").text,
-            student.find("email").text,
-            student.find("taken_CH").text,
-            student.find("cgpa").text
-        ]
-        for i in range(len(row)):
-            pdf.cell(col_widths[i], 10, str(row[i]), 1)
-        pdf.ln()
-
-    output_path = "report/students_report.pdf"
-    pdf.output(output_path)
-    print(f"\nPDF generated successfully: {output_path}")
+    paths = write_table_report("report/students_report.pdf", "Student Information", headers, col_widths,
+                               _student_report_rows(), chunk_rows=chunk_rows,
+                               group_by=2 if by_programme else None)
+    print_report_paths(paths)
 
 def init_student_xml():
     if not os.path.exists(STUDENT_FILE):
@@ -61,11 +35,10 @@ def init_student_xml():
         tree.write(STUDENT_FILE)
 
 def add_student():
-    tree = ET.parse(STUDENT_FILE)
-    root = tree.getroot()
+    store = get_store()
 
     clear_screen()
-    sid = f"S{len(root) + 1:03}"
+    sid = store.next_student_id()
     name = input("Enter student name: ")
     programmes = {
         '1': "Degree in Computer Science (AI)",
@@ -88,54 +61,40 @@ def add_student():
     
     email = input("Enter student email: ")
     
-    student = ET.SubElement(root, "student", id=sid)
-    ET.SubElement(student, "name").text = name
-    ET.SubElement(student, "programme").text = prog
-    ET.SubElement(student, "email").text = email
-    ET.SubElement(student, "taken_CH").text = "0"
-    ET.SubElement(student, "cgpa").text = "0.00"
-    ET.SubElement(student, "cgpa_CH").text = "0" # used to calculate cgpa as pass/fail subject wont count in CGPA calculation
-    
-    tree.write(STUDENT_FILE)
+    try:
+        store.add_student(Student(id=sid, name=name, programme=prog, email=email))
+    except DuplicateKeyError as e:  # also a ConflictError
+        print(f"\nStudent not added: {e}. Please add the student again.")
+        return
     print("---------------------------------")
     print("Student is added with ID:", sid)
     print("---------------------------------")
-    load_students_to_graph("data/students.xml")
 
 def display_students():
     if not os.path.exists(STUDENT_FILE):
         print("No student records found.")
         return
-    
-    tree = ET.parse(STUDENT_FILE)
-    root = tree.getroot()
 
     clear_screen()
     print("-" * 115)
     print(f"{'ID':<10}{'Name':<20}{'Programme':<35}{'Email':<35}{'Taken CH':<10}{'CGPA':<6}")
     print("-" * 115)
 
-    for student in root.findall("student"):
-        sid = student.get("id")
-        name = student.find("name").text
-        programme = student.find("programme").text
-        email = student.find("email").text
-        CH = student.find("taken_CH").text
-        cgpa = student.find("cgpa").text
-        print(f"{sid:<10}{name:<20}{programme:<35}{email:<35}{CH:<10}{cgpa:<6}")
+    for student in get_store().list_students():
+        sid = student.id
+        name = student.name
+        programme = student.programme
+        email = student.email
+        CH = student.taken_ch
+        cgpa = student.cgpa
+        print(f"{sid:<10}{name:<20}{programme:<35}{email:<35}{CH:<10}{cgpa:<6.2f}")
 
     print("-" * 115)
 
 def delete_student(student_id):
-    tree = ET.parse(STUDENT_FILE)
-    root = tree.getroot()
-    for student in root.findall("student"):
-        if student.attrib['id'] == student_id:
-            root.remove(student)
-            tree.write(STUDENT_FILE)
-            print("Student deleted.")
-            load_students_to_graph("data/students.xml")
-            return
+    if get_store().delete_student(student_id):
+        print("Student deleted.")
+        return
     print("Student not found.")
 
 def student_menu():
@@ -144,9 +103,9 @@ def student_menu():
         print("\n======================================================")
         print("                    Student Module                    ")
         print("======================================================")
-        print("1. Add New Student\n2. Edit Student Info\n3. Delete Student\n4. Display All Student\n5. Search Student\n6. Export PDF Student Report\n7. Recommend Subject for Student\n8. Back to Home Page")
+        print("1. Add New Student\n2. Edit Student Info\n3. Delete Student\n4. Display All Student\n5. Search Student\n6. Export PDF Student Report\n7. Recommend Subject for Student\n8. Recommend Subjects for All Students (CSV/XML)\n9. Back to Home Page")
         
-        option = str(input("Select an option on the menu [1-8] : "))
+        option = str(input("Select an option on the menu [1-9] : "))
         
         # Add New Student
         if option == '1':
@@ -189,7 +148,8 @@ def student_menu():
             clear_screen()
         # Export PDF Report
         elif option == '6':
-            generate_student_pdf()
+            chunk_rows, by_programme = ask_report_split("programme")
+            generate_student_pdf(chunk_rows, by_programme)
             input("Press any key to return to student menu...")
             clear_screen()
         elif option == '7':
@@ -199,8 +159,14 @@ def student_menu():
             print("\nPress any key to back to student menu...")
             getchar = input()
             clear_screen()
-        # Back to home page
         elif option == '8':
+            clear_screen()
+            export_recommendations()
+            print("\nPress any key to back to student menu...")
+            getchar = input()
+            clear_screen()
+        # Back to home page
+        elif option == '9':
             break
         else:
             print("Invalid code, please try again. Press any key to continue...")
@@ -1,9 +1,9 @@
 import xml.etree.ElementTree as ET
 import os
-from fpdf import FPDF
 
-from student_module import *
-from grading_module import *
+from data_store import *
+from prereq_graph import *
+from report_utils import *
 from rdf_utils import *
 
 # This function is used to clear the screen
@@ -12,41 +12,18 @@ def clear_screen():
 
 SUBJECT_FILE = "data/subjects.xml"
 
-def generate_subject_pdf():
-    if not os.path.exists(SUBJECT_FILE):
-        print("No subject records found.")
-        return
-
-    # Programme abbreviation mapping
-    programme_map = {
-        "Degree in Computer Science (AI)": "BCS(AI)",
-        "Degree in Computer Science (ST)": "BCS(ST)",
-        "Degree in Computer Science (DCN)": "BCS(DCN)",
-        "Degree in Computer Science (BIA)": "BCS(BIA)",
-        "For All Programmes": "ALL"
-    }
-
-    tree = ET.parse(SUBJECT_FILE)
-    root = tree.getroot()
-
-    pdf = FPDF(orientation='L', unit='mm', format='A4')
-    pdf.add_page()
-    pdf.set_font("Courier", "B", 12)
-    pdf.cell(0, 10, "Subject Information", ln=True, align="C")
-
-    # Table Header
-    pdf.set_font("Courier", "B", 10)
-    headers = ["Subject Code", "Subject Name", "Credit Hour", "Grading", "Programme", "Prerequisite"]
-    col_widths = [35, 95, 30, 50, 30, 30] 
-
-    for i in range(len(headers)):
-        pdf.cell(col_widths[i], 10, headers[i], 1)
-    pdf.ln()
-
-    # Table Rows
-    pdf.set_font("Courier", "", 10)
-    for subject in root.findall("subject"):
-        grading_raw = subject.find("grading").text
+# Programme abbreviation mapping
+PROGRAMME_SHORT_NAMES = {
+    "Degree in Computer Science (AI)": "BCS(AI)",
+    "Degree in Computer Science (ST)": "BCS(ST)",
+    "Degree in Computer Science (DCN)": "BCS(DCN)",
+    "Degree in Computer Science (BIA)": "BCS(BIA)",
+    "For All Programmes": "ALL"
+}
+
+def _subject_report_rows():
+    for subject in get_store().iter_subjects():
+        grading_raw = subject.grading
         if grading_raw == "G":
             grading_text = "With Grade A, B, C"
         elif grading_raw == "P":
@@ -54,29 +31,24 @@ def generate_subject_pdf():
         else:
             grading_text = "Unknown"
 
-        programme_elem = subject.find("programme")
-        programme_full = programme_elem.text.strip() if programme_elem is not None and programme_elem.text else "All"
-        programme_short = programme_map.get(programme_full, programme_full)  # Shorten if mapping exists
+        programme_full = subject.programme or "All"
+        programme_short = PROGRAMME_SHORT_NAMES.get(programme_full, programme_full)  # Shorten if mapping exists
 
-        prereq_elem = subject.find("prerequisite")
-        prerequisite = prereq_elem.text.strip() if prereq_elem is not None and prereq_elem.text else "None"
+        prerequisite = subject.prerequisite or "None"
 
-        row = [
-            subject.get("code"),
-            subject.find("name").text,
-            subject.find("credit").text,
-            grading_text,
-            programme_short,
-            prerequisite
-        ]
+        yield (subject.code, subject.name, subject.credit, grading_text, programme_short, prerequisite)
 
-        for i in range(len(row)):
-            pdf.cell(col_widths[i], 10, str(row[i]), 1)
-        pdf.ln()
+def generate_subject_pdf(chunk_rows=None, by_programme=False):
+    if not os.path.exists(SUBJECT_FILE):
+        print("No subject records found.")
+        return
 
-    output_path = "report/subjects_report.pdf"
-    pdf.output(output_path)
-    print(f"\nPDF generated successfully: {output_path}")
+    headers = ["Subject Code", "Subject Name", "Credit Hour", "Grading", "Programme", "Prerequisite"]
+    col_widths = [35, 95, 30, 50, 30, 30] 
+    paths = write_table_report("report/subjects_report.pdf", "Subject Information", headers, col_widths,
+                               _subject_report_rows(), chunk_rows=chunk_rows,
+                               group_by=4 if by_programme else None)
+    print_report_paths(paths)
 
 def init_subject_xml():
     if not os.path.exists(SUBJECT_FILE):
@@ -85,16 +57,9 @@ def init_subject_xml():
         tree.write(SUBJECT_FILE)
 
 def subject_exists(code):
-    if not os.path.exists(SUBJECT_FILE):
-        return False
-    tree = ET.parse(SUBJECT_FILE)
-    root = tree.getroot()
-    return any(subject.get("code") == code for subject in root.findall("subject"))
+    return get_store().get_subject(code) is not None
 
 def add_subject():
-    tree = ET.parse(SUBJECT_FILE)
-    root = tree.getroot()
-
     clear_screen()
     code = input("Enter subject code: ").strip()
 
@@ -133,8 +98,14 @@ def add_subject():
         else:
             print("Invalid selection. Please try again.\n")
 
-    # Prerequisite subject
-    prereq = input("\nEnter prerequisite subject code (leave blank if none): ").strip()
+    # Prerequisite subject(s), combined with AND / OR if more than one
+    while True:
+        prereq = input("\nEnter prerequisite subject code(s), e.g. TCP6114 AND (TDB6113 OR TDC6123)"
+                       " (leave blank if none): ").strip()
+        error = prerequisite_error(code, prereq)
+        if error is None:
+            break
+        print(error)
 
     while True:
         print("\nEnter grading system")
@@ -150,14 +121,18 @@ def add_subject():
         else:
             print("Invalid selection. Please choose 1 or 2.\n")
 
-    subject = ET.SubElement(root, "subject", code=code)
-    ET.SubElement(subject, "name").text = name
-    ET.SubElement(subject, "credit").text = credit
-    ET.SubElement(subject, "programme").text = programme
-    ET.SubElement(subject, "prerequisite").text = prereq if prereq else ""
-    ET.SubElement(subject, "grading").text = grading
-    
-    tree.write(SUBJECT_FILE)
+    try:
+        get_store().add_subject(Subject(
+            code=code,
+            name=name,
+            credit=int(credit),
+            programme=programme,
+            prerequisite=prereq if prereq else "",
+            grading=grading
+        ))
+    except ConflictError as e:
+        print(f"\nSubject not added: {e}.")
+        return
     print("\nSubject", code, "has been added successfully.")
 
 def display_subjects():
@@ -165,14 +140,13 @@ def display_subjects():
         print("Subject file not found.")
         return
 
-    tree = ET.parse(SUBJECT_FILE)
-    root = tree.getroot()
+    subjects = get_store().list_subjects()
 
     clear_screen()
     print("\nList of Subjects")
     print("=" * 145)
 
-    if len(root) == 0:
+    if len(subjects) == 0:
         print("No subjects found.")
         return
 
@@ -180,16 +154,13 @@ def display_subjects():
     print(f"{'Code':<10} {'Subject Name':<45} {'Credit Hours':<15} {'Grading System':<20} {'Programme':<35} {'Prerequisite':<15}")
     print("-" * 145)
 
-    for subject in root.findall("subject"):
-        code = subject.get("code")
-        name = subject.find("name").text
-        credit = subject.find("credit").text
-        grading = subject.find("grading").text
-        programme = subject.find("programme").text if subject.find("programme") is not None else "N/A"
-        prereq_elem = subject.find("prerequisite")
-        prerequisite = (
-            prereq_elem.text.strip() if prereq_elem is not None and prereq_elem.text else "None"
-        )
+    for subject in subjects:
+        code = subject.code
+        name = subject.name
+        credit = subject.credit
+        grading = subject.grading
+        programme = subject.programme or "N/A"
+        prerequisite = subject.prerequisite or "None"
         grading_desc = "With Grade (G)" if grading == "G" else "With Pass/Fail (P)"
 
         print(f"{code:<10} {name:<45} {credit:<15} {grading_desc:<20} {programme:<35} {prerequisite:<15}")
@@ -197,15 +168,10 @@ def display_subjects():
     print("=" * 145)
 
 def delete_subject(code):
-    tree = ET.parse(SUBJECT_FILE)
-    root = tree.getroot()
-    for subject in root.findall("subject"):
-        if subject.attrib['code'] == code:
-            root.remove(subject)
-            tree.write(SUBJECT_FILE)
-            clear_screen()
-            print("Subject [",code, "] is deleted.")
-            return
+    if get_store().delete_subject(code):
+        clear_screen()
+        print("Subject [",code, "] is deleted.")
+        return
     print("Subject not found.")
 
 def subject_menu():
@@ -259,7 +225,8 @@ def subject_menu():
             clear_screen()
         # Back to home page
         elif option == '6':
-            generate_subject_pdf()
+            chunk_rows, by_programme = ask_report_split("programme")
+            generate_subject_pdf(chunk_rows, by_programme)
             print("Press any key to back to subject menu...")
             getchar = input()
             clear_screen()
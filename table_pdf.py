@@ -0,0 +1,72 @@
+# FPDF document used by report_utils.py for table reports; kept apart so
+# fpdf is only imported when a report is written.
+
+from fpdf import FPDF
+
+ROW_HEIGHT = 10
+
+
+class _OutputBuffer:
+    """Stand-in for FPDF's output string that appends in constant time.
+
+    FPDF builds the finished document with buffer += text, which copies the
+    whole buffer each time and makes large documents quadratic to write.
+    """
+
+    def __init__(self):
+        self.parts = []
+        self.size = 0
+
+    def __iadd__(self, text):
+        self.parts.append(text)
+        self.size += len(text)
+        return self
+
+    def __len__(self):
+        return self.size
+
+    def encode(self, encoding):
+        return "".join(self.parts).encode(encoding)
+
+
+class TablePDF(FPDF):
+    """Landscape A4 document that draws the title and table header on every page."""
+
+    def __init__(self, title, headers, widths):
+        FPDF.__init__(self, orientation='L', unit='mm', format='A4')
+        self.buffer = _OutputBuffer()
+        self.report_title = title
+        self.headers = headers
+        self.widths = widths
+        self.rows = 0
+        self.alias_nb_pages()
+        self.set_auto_page_break(True, margin=15)
+        self.set_font("Courier", "", 10)
+        self.add_page()
+
+    def header(self):
+        self.set_font("Courier", "B", 12)
+        self.cell(0, 10, self.report_title, ln=True, align="C")
+        self.set_font("Courier", "B", 10)
+        for i in range(len(self.headers)):
+            self.cell(self.widths[i], ROW_HEIGHT, self.headers[i], 1)
+        self.ln()
+
+    def footer(self):
+        self.set_y(-12)
+        self.set_font("Courier", "I", 8)
+        self.cell(0, 8, f"Page {self.page_no()} of {{nb}}", align="C")
+
+    def add_row(self, row):
+        # Start the new page before the first cell so a row is never split
+        if self.get_y() + ROW_HEIGHT > self.page_break_trigger:
+            self.add_page()
+        for i in range(len(row)):
+            self.cell(self.widths[i], ROW_HEIGHT, str(row[i]), 1)
+        self.ln()
+        self.rows += 1
+
+# If this file is executed, redirect to main.py
+if __name__ == "__main__":
+    import main
+    main.main()
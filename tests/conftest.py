@@ -0,0 +1,33 @@
+# The modules live at the top of the repository and use paths relative to
+# it (data/..., report/...), so tests import them from there.
+
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import shutil
+
+import pytest
+
+from data_store import DataStore
+
+
+@pytest.fixture
+def data_files(tmp_path):
+    """Copies of the student, subject and grade files in a scratch folder."""
+    paths = []
+    for name in ("students.xml", "subjects.xml", "grades.xml"):
+        shutil.copy(os.path.join(ROOT, "data", name), tmp_path / name)
+        paths.append(str(tmp_path / name))
+    return tuple(paths)
+
+
+@pytest.fixture
+def store(data_files):
+    """A DataStore over the scratch copies of the data files."""
+    store = DataStore(*data_files)
+    yield store
+    store.close()
@@ -0,0 +1,58 @@
+# calculate_grade() and calculate_grades() must give the same result as the
+# original if/elif chain for every mark, in range or not.
+
+import pytest
+
+from grading_share_utils import calculate_grade, calculate_grades
+
+# The branches of the original chain for grading type 'G', in order:
+# (lowest mark, highest mark, grade, GPA), both ends inclusive.
+OLD_G_BRANCHES = [
+    (90, 100, 'A+', 4.00), (80, 89, 'A', 4.00),
+    (79, 79, 'A-', 3.93), (78, 78, 'A-', 3.87), (77, 77, 'A-', 3.80), (76, 76, 'A-', 3.73), (75, 75, 'A-', 3.67),
+    (74, 74, 'B+', 3.60), (73, 73, 'B+', 3.53), (72, 72, 'B+', 3.47), (71, 71, 'B+', 3.40), (70, 70, 'B+', 3.33),
+    (69, 69, 'B', 3.27), (68, 68, 'B', 3.20), (67, 67, 'B', 3.13), (66, 66, 'B', 3.07), (65, 65, 'B', 3.00),
+    (64, 64, 'B-', 2.93), (63, 63, 'B-', 2.87), (62, 62, 'B-', 2.80), (61, 61, 'B-', 2.73), (60, 60, 'B-', 2.67),
+    (59, 59, 'C+', 2.59), (58, 58, 'C+', 2.53), (57, 57, 'C+', 2.46), (56, 56, 'C+', 2.40), (55, 55, 'C+', 2.33),
+    (54, 54, 'C', 2.26), (53, 53, 'C', 2.20), (52, 52, 'C', 2.13), (51, 51, 'C', 2.07), (50, 50, 'C', 2.00),
+    (47, 49, 'C-', 1.67), (44, 46, 'D+', 1.33), (40, 43, 'D', 1.00), (0, 39, 'F', 0.00),
+]
+
+MARKS = range(-50, 201)
+
+
+def old_calculate_grade(mark, grading_type):
+    mark = int(mark)
+    if grading_type == 'G':
+        for lowest, highest, grade, gpa in OLD_G_BRANCHES:
+            if lowest <= mark <= highest:
+                return grade, gpa
+        return 'Invalid', 0.00
+    return ('PASS', 4.00) if mark >= 40 else ('FAIL', 0.00)
+
+
+@pytest.mark.parametrize("grading_type", ['G', 'P'])
+def test_every_mark_matches_old_chain(grading_type):
+    for mark in MARKS:
+        assert calculate_grade(mark, grading_type) == old_calculate_grade(mark, grading_type), mark
+
+
+@pytest.mark.parametrize("grading_type", ['G', 'P'])
+def test_string_marks(grading_type):
+    for mark in ("0", "39", "40", "75", "100", "101", "-1"):
+        assert calculate_grade(mark, grading_type) == old_calculate_grade(mark, grading_type), mark
+
+
+@pytest.mark.parametrize("grading_type", ['G', 'P'])
+def test_batch_list_matches_old_chain(grading_type):
+    grades, gpas = calculate_grades(list(MARKS), grading_type)
+    assert list(zip(grades, gpas)) == [old_calculate_grade(m, grading_type) for m in MARKS]
+
+
+@pytest.mark.parametrize("grading_type", ['G', 'P'])
+def test_batch_numpy_matches_old_chain(grading_type):
+    np = pytest.importorskip("numpy")
+    grades, gpas = calculate_grades(np.array(list(MARKS)), grading_type)
+    assert isinstance(grades, np.ndarray) and isinstance(gpas, np.ndarray)
+    assert [(str(g), float(p)) for g, p in zip(grades, gpas)] == \
+        [old_calculate_grade(m, grading_type) for m in MARKS]
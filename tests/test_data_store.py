@@ -0,0 +1,66 @@
+import pytest
+
+from data_store import ConflictError, DataStore, DuplicateKeyError, Grade, Student
+
+
+def test_redo_keeps_a_change_made_meanwhile(store, data_files):
+    other = DataStore(*data_files)
+    with store.transaction():
+        store.add_grade(Grade("S003", "TDB6113", 81, "A", 4.0))
+        other.add_grade(Grade("S004", "TDB6113", 40, "F", 0.0))
+    assert store.conflicts == 1
+
+    saved = DataStore(*data_files)
+    assert saved.get_grade("S003", "TDB6113").mark == 81
+    assert saved.get_grade("S004", "TDB6113").mark == 40
+    assert saved.verify_cgpa() == []
+
+
+def test_redo_does_not_overwrite_a_grade_added_meanwhile(store, data_files):
+    other = DataStore(*data_files)
+    with pytest.raises(ConflictError) as raised:
+        with store.transaction():
+            store.add_grade(Grade("S003", "TCS6223", 81, "A", 4.0))
+            store.add_grade(Grade("S003", "TDB6113", 81, "A", 4.0))
+            other.add_grade(Grade("S003", "TDB6113", 40, "F", 0.0))
+    assert (raised.value.kind, raised.value.key) == ("grade", ("S003", "TDB6113"))
+
+    # nothing of the transaction was saved, and the other grade was kept
+    for s in (store, DataStore(*data_files)):
+        assert s.get_grade("S003", "TDB6113").mark == 40
+        assert s.get_grade("S003", "TCS6223") is None
+        assert s.verify_cgpa() == []
+
+
+def test_delete_then_add_student_keeps_the_other_students(store, data_files):
+    teo = store.get_student("S004")
+    store.delete_student("S002")
+    new_id = store.next_student_id()
+    assert new_id == "S005"
+    store.add_student(Student(new_id, "NEW STUDENT", teo.programme, "new@student.mmu.edu.my"))
+
+    saved = DataStore(*data_files)
+    assert saved.get_student("S004").name == teo.name
+    assert saved.get_student("S005").name == "NEW STUDENT"
+    with pytest.raises(DuplicateKeyError):
+        store.add_student(Student("S004", "SOMEONE ELSE", teo.programme, "else@student.mmu.edu.my"))
+    assert DataStore(*data_files).get_student("S004").name == teo.name
+
+
+def test_next_student_id_skips_deleted_students_with_grades(store):
+    store.delete_student("S004")  # S004's grades are kept
+    assert store.next_student_id() == "S005"
+
+
+def test_readded_student_is_not_given_the_old_journalled_cgpa(store, data_files):
+    store.add_grade(Grade("S004", "TDB6113", 75, "A-", 3.67))
+    old = store.get_student("S004")
+    store.delete_student("S004")
+    store.add_student(Student("S004", "NEW STUDENT", old.programme, "new@student.mmu.edu.my"))
+
+    fields = lambda s: (s.cgpa, s.taken_ch, s.cgpa_ch)
+    assert fields(store.get_student("S004")) == (0.0, 0, 0)
+    # as another process, or a restart before the journal is compacted, reads it
+    saved = DataStore(*data_files)
+    assert fields(saved.get_student("S004")) == (0.0, 0, 0)
+    assert [fields(s) for s in saved.iter_students() if s.id == "S004"] == [(0.0, 0, 0)]
@@ -0,0 +1,40 @@
+import grading_module
+from data_store import Grade
+from prereq_graph import PrerequisiteGraph
+
+
+def test_prerequisite_passed_in_a_session_unlocks_its_dependents(store, monkeypatch):
+    graph = PrerequisiteGraph(store)
+    store.add_listener(graph.on_change)
+    monkeypatch.setattr(grading_module, "get_store", lambda: store)
+    monkeypatch.setattr(grading_module, "get_prerequisite_graph", lambda: graph)
+    student = store.get_student("S004")  # BIA; TBI6223 requires TDB6113
+    subjects = store.list_subjects()
+
+    def eligible_codes():
+        eligible, ineligible = grading_module.classify_subjects(student.id, student.programme, subjects)
+        return [s.code for s in eligible]
+
+    assert "TDB6113" in eligible_codes()
+    assert "TBI6223" not in eligible_codes()
+
+    # one Add Marks session: the prerequisite, then the subject needing it
+    with store.transaction():
+        store.add_grade(Grade(student.id, "TDB6113", 75, "A-", 3.67))
+        assert graph.has_passed(student.id, "TDB6113")
+        assert "TDB6113" not in eligible_codes()
+        assert "TBI6223" in eligible_codes()
+        store.add_grade(Grade(student.id, "TBI6223", 70, "B+", 3.33))
+        assert "TBI6223" not in eligible_codes()
+
+    assert graph.has_passed(student.id, "TBI6223")
+    assert store.get_grade(student.id, "TBI6223").mark == 70
+
+
+def test_failed_prerequisite_in_a_session_does_not_unlock(store):
+    graph = PrerequisiteGraph(store)
+    store.add_listener(graph.on_change)
+    with store.transaction():
+        store.add_grade(Grade("S004", "TDB6113", 30, "F", 0.0))
+        assert not graph.has_passed("S004", "TDB6113")
+        assert not graph.is_eligible("TBI6223", graph.passed("S004"))
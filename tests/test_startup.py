@@ -0,0 +1,5 @@
+from startup_budget import check_startup
+
+
+def test_startup_within_budget_and_lazy_modules_not_loaded():
+    assert check_startup() == []